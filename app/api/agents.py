@@ -1,24 +1,54 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import json
+from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.auth import get_current_active_user
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db, get_read_db, get_session_factory
 from app.models.user import User
 from app.models.agent import Agent
 from app.models.agent_tools import AgentTool
 from app.schemas.agent import Agent as AgentSchema, AgentCreate, AgentUpdate, AgentExecute
 from app.schemas.execution import Execution as ExecutionSchema
-from app.services.agent_service import AgentService
+from app.schemas.conversation import Conversation as ConversationSchema, ConversationDetail
+from app.services.agent_service import AgentService, system_message_cache
+from app.services.prompt_service import PromptService
+from app.services.conversation_service import ConversationService
+from app.utils.context_budget import ContextBudgetExceeded
+from app.utils.persistence import save
 
 router = APIRouter()
 
+def _validate_prompt_template(
+    db: Session,
+    current_user: User,
+    template_id: Optional[int],
+    variables: Optional[Dict[str, Any]]
+):
+    """Check that a referenced prompt template exists and its fixed variables are complete"""
+    if template_id is None:
+        return
+    
+    prompt_service = PromptService(db)
+    template = prompt_service.get_cached_template(template_id)
+    if not template or not template.is_active:
+        raise HTTPException(status_code=400, detail="Prompt template not found or inactive")
+    
+    if current_user.role != "Admin" and template.created_by != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions for prompt template")
+    
+    errors = prompt_service.validate_batch(template, [variables or {}])
+    if errors:
+        raise HTTPException(status_code=400, detail=errors[0]["error"])
+
 @router.get("/", response_model=List[AgentSchema])
 def get_agents(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role == "Admin":
         agents = db.query(Agent).offset(skip).limit(limit).all()
@@ -33,15 +63,22 @@ def create_agent(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    _validate_prompt_template(
+        db, current_user, agent_data.prompt_template_id, agent_data.prompt_template_variables
+    )
+    
     # Create agent
     agent = Agent(
-        **agent_data.dict(exclude={"tool_ids"}),
+        **agent_data.dict(exclude={"tool_ids", "prompt_template_variables", "context_key_priority", "model_routes"}),
+        prompt_template_variables=json.dumps(agent_data.prompt_template_variables or {}),
+        context_key_priority=json.dumps(agent_data.context_key_priority or []),
+        model_routes=json.dumps([route.dict() for route in agent_data.model_routes or []]),
         created_by=current_user.id
     )
     
+    # Flush for the agent id; the tools are committed with it
     db.add(agent)
-    db.commit()
-    db.refresh(agent)
+    db.flush()
     
     # Add tools to agent
     if agent_data.tool_ids:
@@ -52,8 +89,7 @@ def create_agent(
             )
             db.add(agent_tool)
     
-    db.commit()
-    db.refresh(agent)
+    save(db, agent)
     
     return agent
 
@@ -88,10 +124,21 @@ def update_agent(
     if current_user.role != "Admin" and agent.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    # Update agent fields
+    # Validate the resulting prompt template reference
     update_data = agent_update.dict(exclude_unset=True, exclude={"tool_ids"})
+    if "prompt_template_id" in update_data or "prompt_template_variables" in update_data:
+        template_id = update_data.get("prompt_template_id", agent.prompt_template_id)
+        variables = update_data.get("prompt_template_variables")
+        if variables is None:
+            variables = json.loads(agent.prompt_template_variables or "{}")
+        _validate_prompt_template(db, current_user, template_id, variables)
+    
+    # Update agent fields
     for field, value in update_data.items():
-        setattr(agent, field, value)
+        if field in ("prompt_template_variables", "context_key_priority", "model_routes") and value is not None:
+            setattr(agent, field, json.dumps(value))
+        else:
+            setattr(agent, field, value)
     
     # Update tools if provided
     if agent_update.tool_ids is not None:
@@ -106,8 +153,9 @@ def update_agent(
             )
             db.add(agent_tool)
     
-    db.commit()
-    db.refresh(agent)
+    save(db, agent)
+    
+    system_message_cache.invalidate(agent_id)
     
     return agent
 
@@ -128,16 +176,20 @@ def delete_agent(
     db.delete(agent)
     db.commit()
     
+    system_message_cache.invalidate(agent_id)
+    
     return {"message": "Agent deleted successfully"}
 
 @router.post("/{agent_id}/execute", response_model=ExecutionSchema)
-def execute_agent(
+async def execute_agent(
     agent_id: int,
     execution_data: AgentExecute,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    session_factory: sessionmaker = Depends(get_session_factory)
 ):
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = await db.get(Agent, agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
@@ -145,15 +197,77 @@ def execute_agent(
     if current_user.role != "Admin" and agent.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    # Execute agent
-    agent_service = AgentService(db)
+    # Don't hold this connection while the LLM call runs
+    await db.close()
+    
+    # Execute agent (LangChain and the tool layer are synchronous)
     try:
-        execution = agent_service.execute_agent(
+        execution = await run_in_threadpool(
+            _run_execution, session_factory, agent_id, current_user, execution_data
+        )
+    except ContextBudgetExceeded as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Summarize old conversation turns once the response is sent
+    if execution.conversation_id and execution.status == "completed":
+        background_tasks.add_task(
+            _run_compaction, session_factory, agent_id, execution.conversation_id,
+            current_user.id, execution.id
+        )
+    
+    return execution
+
+def _run_execution(session_factory: sessionmaker, agent_id: int, user: User, execution_data: AgentExecute):
+    db = session_factory()
+    try:
+        return AgentService(db).execute_agent(
             agent_id=agent_id,
-            user=current_user,
+            user=user,
             input_message=execution_data.input_message,
-            context=execution_data.context
+            context=execution_data.context,
+            conversation_id=execution_data.conversation_id
         )
-        return execution
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    finally:
+        db.close()
+
+def _run_compaction(
+    session_factory: sessionmaker, agent_id: int, conversation_id: int, user_id: int, execution_id: int
+):
+    db = session_factory()
+    try:
+        AgentService(db).compact_conversation(agent_id, conversation_id, user_id, execution_id)
+    finally:
+        db.close()
+
+@router.post("/{agent_id}/conversations", response_model=ConversationSchema)
+def create_conversation(
+    agent_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Start a conversation whose history is kept server-side across executions"""
+    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    
+    # Check permissions
+    if current_user.role != "Admin" and agent.created_by != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    conversation_service = ConversationService(db)
+    return conversation_service.create_conversation(agent_id, current_user.id)
+
+@router.get("/{agent_id}/conversations/{conversation_id}", response_model=ConversationDetail)
+def get_conversation(
+    agent_id: int,
+    conversation_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    conversation_service = ConversationService(db)
+    try:
+        return conversation_service.get_conversation(conversation_id, current_user.id, agent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
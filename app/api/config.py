@@ -8,6 +8,7 @@ from app.core.database import get_db
 from app.models.user import User
 from app.models.system_config import SystemConfig
 from app.services.config_service import config_service
+from app.services.config_registry import config_registry
 
 router = APIRouter()
 
@@ -28,6 +29,13 @@ class ConfigCreate(BaseModel):
     description: str = None
     is_encrypted: bool = False
 
+def _validate_value(config_key: str, config_value: str):
+    """Reject values a declared key would not accept at reload time"""
+    try:
+        config_registry.validate(config_key, config_value)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid value for {config_key}: {e}")
+
 @router.get("/", response_model=List[ConfigItem])
 def get_all_configs(
     current_user: User = Depends(get_current_admin_user),
@@ -86,6 +94,8 @@ def create_config(
     if existing:
         raise HTTPException(status_code=400, detail="Configuration already exists")
     
+    _validate_value(config_data.config_key, config_data.config_value)
+    
     # Use config service to set the value
     success = config_service.set_config(
         key=config_data.config_key,
@@ -121,6 +131,8 @@ def update_config(
     if not existing:
         raise HTTPException(status_code=404, detail="Configuration not found")
     
+    _validate_value(config_key, config_update.config_value)
+    
     # Use config service to update the value
     success = config_service.set_config(
         key=config_key,
@@ -158,12 +170,12 @@ def delete_config(
     return {"message": "Configuration deleted successfully"}
 
 @router.post("/reload")
-def force_reload_config(
+async def force_reload_config(
     current_user: User = Depends(get_current_admin_user)
 ):
     """Force reload configuration cache (admin only)"""
     
-    config_service.reload_config()
+    await config_service.areload_config(full=True)
     
     return {"message": "Configuration reloaded successfully"}
 
@@ -177,5 +189,8 @@ def get_hot_reload_status(
         "hot_reload_enabled": config_service.is_hot_reload_enabled(),
         "last_reload": config_service._last_reload,
         "reload_interval": config_service._reload_interval,
+        "full_reload_interval": config_service._full_reload_interval,
+        "version_poll_interval": config_service._version_poll_interval,
+        "config_version": config_service._version,
         "running": config_service._running
     }
\ No newline at end of file
@@ -1,17 +1,21 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
 from app.core.auth import get_current_active_user, get_current_admin_user
-from app.core.database import get_db
+from app.core.config import settings
+from app.core import database
+from app.core.database import get_async_read_db, replica_lag
 from app.models.user import User
 from app.models.execution import Execution
 from app.models.cost import Cost
 from app.schemas.execution import Execution as ExecutionSchema
 from app.schemas.cost import Cost as CostSchema
 from app.services.cost_service import CostService
+from app.utils.pool_metrics import pool_status
 
 router = APIRouter()
 
@@ -19,6 +23,7 @@ class CostSummary(BaseModel):
     total_amount: float
     total_tokens_input: int
     total_tokens_output: int
+    total_tokens_cached: int = 0
     total_entries: int
     by_type: dict
 
@@ -31,12 +36,12 @@ class UsageMetrics(BaseModel):
     total_cost: float
 
 @router.get("/costs", response_model=CostSummary)
-def get_costs(
+async def get_costs(
     cost_type: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     cost_service = CostService(db)
     
@@ -44,14 +49,14 @@ def get_costs(
     if current_user.role == "Admin":
         # For admin, get overall costs (would need to modify cost_service method)
         # For now, return user's own costs
-        costs = cost_service.get_user_costs(
+        costs = await cost_service.aget_user_costs(
             user_id=current_user.id,
             cost_type=cost_type,
             start_date=start_date,
             end_date=end_date
         )
     else:
-        costs = cost_service.get_user_costs(
+        costs = await cost_service.aget_user_costs(
             user_id=current_user.id,
             cost_type=cost_type,
             start_date=start_date,
@@ -61,35 +66,35 @@ def get_costs(
     return CostSummary(**costs)
 
 @router.get("/usage", response_model=UsageMetrics)
-def get_usage_metrics(
+async def get_usage_metrics(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Build query
-    query = db.query(Execution)
+    query = select(Execution)
     
     # Filter by user (admins can see all)
     if current_user.role != "Admin":
-        query = query.filter(Execution.user_id == current_user.id)
+        query = query.where(Execution.user_id == current_user.id)
     
     # Apply date filters
     if start_date:
         try:
             start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(Execution.started_at >= start_dt)
+            query = query.where(Execution.started_at >= start_dt)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid start_date format")
     
     if end_date:
         try:
             end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(Execution.started_at <= end_dt)
+            query = query.where(Execution.started_at <= end_dt)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid end_date format")
     
-    executions = query.all()
+    executions = (await db.execute(query)).scalars().all()
     
     if not executions:
         return UsageMetrics(
@@ -126,59 +131,82 @@ def get_usage_metrics(
     )
 
 @router.get("/executions", response_model=List[ExecutionSchema])
-def get_executions(
+async def get_executions(
     skip: int = Query(0),
     limit: int = Query(100),
     status: Optional[str] = Query(None),
     agent_id: Optional[int] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Build query
-    query = db.query(Execution)
+    query = select(Execution)
     
     # Filter by user (admins can see all)
     if current_user.role != "Admin":
-        query = query.filter(Execution.user_id == current_user.id)
+        query = query.where(Execution.user_id == current_user.id)
     
     # Apply filters
     if status:
-        query = query.filter(Execution.status == status)
+        query = query.where(Execution.status == status)
     
     if agent_id:
-        query = query.filter(Execution.agent_id == agent_id)
+        query = query.where(Execution.agent_id == agent_id)
     
     # Order by most recent first
     query = query.order_by(Execution.started_at.desc())
     
     # Apply pagination
-    executions = query.offset(skip).limit(limit).all()
+    executions = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
     
     return executions
 
 @router.get("/costs/detailed", response_model=List[CostSchema])
-def get_detailed_costs(
+async def get_detailed_costs(
     skip: int = Query(0),
     limit: int = Query(100),
     cost_type: Optional[str] = Query(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Build query
-    query = db.query(Cost)
+    query = select(Cost)
     
     # Filter by user (admins can see all)
     if current_user.role != "Admin":
-        query = query.filter(Cost.user_id == current_user.id)
+        query = query.where(Cost.user_id == current_user.id)
     
     # Apply filters
     if cost_type:
-        query = query.filter(Cost.cost_type == cost_type)
+        query = query.where(Cost.cost_type == cost_type)
     
     # Order by most recent first
     query = query.order_by(Cost.created_at.desc())
     
     # Apply pagination
-    costs = query.offset(skip).limit(limit).all()
+    costs = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
     
-    return costs
\ No newline at end of file
+    return costs
+
+@router.get("/db-pool")
+def get_db_pool_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Connection pool occupancy and checkout wait times of this worker (admin only)"""
+    metrics = {
+        "sync": _engine_pool_status(database.engine, database.engine_pool_stats),
+        "async": _engine_pool_status(database.async_engine.sync_engine, database.async_engine_pool_stats)
+    }
+    if database.read_engine is not None:
+        metrics["replica"] = {
+            "sync": _engine_pool_status(database.read_engine, database.read_engine_pool_stats),
+            "async": _engine_pool_status(
+                database.async_read_engine.sync_engine, database.async_read_engine_pool_stats
+            ),
+            "lag": replica_lag.snapshot()
+        }
+    return metrics
+
+def _engine_pool_status(engine, stats) -> dict:
+    max_overflow = settings.db_max_overflow if database.uses_configured_pool(engine.url) else None
+    return pool_status(engine.pool, stats, max_overflow)
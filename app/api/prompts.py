@@ -1,11 +1,13 @@
 import json
 from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.core.auth import get_current_active_user
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
 from app.models.user import User
 from app.models.prompt_template import PromptTemplate
 from app.schemas.prompt_template import (
@@ -14,6 +16,8 @@ from app.schemas.prompt_template import (
     PromptTemplateUpdate
 )
 from app.services.prompt_service import PromptService
+from app.utils import fast_json
+from app.utils.persistence import save
 
 router = APIRouter()
 
@@ -23,18 +27,31 @@ class RenderRequest(BaseModel):
 class RenderResponse(BaseModel):
     rendered_content: str
 
+class BatchRenderRequest(BaseModel):
+    variables: List[Dict[str, Any]]
+
+class BatchRenderResponse(BaseModel):
+    rendered_contents: List[str]
+    count: int
+
+class TemplateIssueDetail(BaseModel):
+    message: str
+    offset: int
+
 class ValidateResponse(BaseModel):
     is_valid: bool
     variables: List[str]
     variable_count: int
+    escape_count: int = 0
     issues: List[str]
+    issue_details: List[TemplateIssueDetail] = []
 
 @router.get("/", response_model=List[PromptTemplateSchema])
 def get_prompt_templates(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role == "Admin":
         templates = db.query(PromptTemplate).offset(skip).limit(limit).all()
@@ -72,9 +89,10 @@ def create_prompt_template(
         created_by=current_user.id
     )
     
-    db.add(template)
-    db.commit()
-    db.refresh(template)
+    save(db, template)
+    
+    # A new template may be the latest version for its name
+    prompt_service.invalidate_template(template)
     
     return template
 
@@ -109,9 +127,11 @@ def update_prompt_template(
     if current_user.role != "Admin" and template.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    previous_name = template.name
+    prompt_service = PromptService(db)
+    
     # Validate new template content if provided
     if template_update.template_content:
-        prompt_service = PromptService(db)
         validation = prompt_service.validate_template(template_update.template_content)
         
         if not validation["is_valid"]:
@@ -131,8 +151,10 @@ def update_prompt_template(
         else:
             setattr(template, field, value)
     
-    db.commit()
-    db.refresh(template)
+    save(db, template)
+    
+    # Content may have changed without a version bump
+    prompt_service.invalidate_template(template, previous_name=previous_name)
     
     return template
 
@@ -153,6 +175,8 @@ def delete_prompt_template(
     db.delete(template)
     db.commit()
     
+    PromptService(db).invalidate_template(template)
+    
     return {"message": "Template deleted successfully"}
 
 @router.post("/{template_id}/render", response_model=RenderResponse)
@@ -162,7 +186,9 @@ def render_template(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    template = db.query(PromptTemplate).filter(PromptTemplate.id == template_id).first()
+    # Served from the template cache, no query in the steady state
+    prompt_service = PromptService(db)
+    template = prompt_service.get_cached_template(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
@@ -171,7 +197,6 @@ def render_template(
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     try:
-        prompt_service = PromptService(db)
         rendered_content = prompt_service.render_template(
             template_id, 
             render_request.variables
@@ -180,6 +205,55 @@ def render_template(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/{template_id}/render/batch", response_model=BatchRenderResponse)
+def render_template_batch(
+    template_id: int,
+    render_request: BatchRenderRequest,
+    stream: bool = Query(False),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Render a template for many variable sets in one request.
+    
+    Every set is validated before anything is rendered. With stream=true the
+    results are sent as NDJSON lines ({"index": i, "rendered_content": ...})
+    as they are rendered.
+    """
+    prompt_service = PromptService(db)
+    template = prompt_service.get_cached_template(template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    # Check permissions
+    if current_user.role != "Admin" and template.created_by != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if not template.is_active:
+        raise HTTPException(status_code=400, detail=f"Template with id {template_id} is inactive")
+    
+    if len(render_request.variables) > settings.prompt_batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: maximum is {settings.prompt_batch_max_items} variable sets"
+        )
+    
+    errors = prompt_service.validate_batch(template, render_request.variables)
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+    
+    rendered = prompt_service.render_batch(template, render_request.variables)
+    
+    if stream:
+        def generate():
+            for index, content in enumerate(rendered):
+                yield fast_json.dumps_bytes({"index": index, "rendered_content": content}) + b"\n"
+        
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+    
+    rendered_contents = list(rendered)
+    return BatchRenderResponse(rendered_contents=rendered_contents, count=len(rendered_contents))
+
 @router.post("/{template_id}/validate", response_model=ValidateResponse)
 def validate_template(
     template_id: int,
@@ -3,10 +3,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_active_user
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.user import User
 from app.models.tool import Tool
 from app.schemas.tool import Tool as ToolSchema, ToolCreate, ToolUpdate
+from app.utils.circuit_breaker import tool_circuit_breakers
+from app.utils.http_cache import tool_response_cache
+from app.utils.persistence import save
 
 router = APIRouter()
 
@@ -15,7 +18,7 @@ def get_tools(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role == "Admin":
         tools = db.query(Tool).offset(skip).limit(limit).all()
@@ -43,9 +46,7 @@ def create_tool(
         created_by=current_user.id
     )
     
-    db.add(tool)
-    db.commit()
-    db.refresh(tool)
+    save(db, tool)
     
     return tool
 
@@ -93,8 +94,11 @@ def update_tool(
     for field, value in update_data.items():
         setattr(tool, field, value)
     
-    db.commit()
-    db.refresh(tool)
+    save(db, tool)
+    
+    # Cached responses and circuit state may no longer match the tool configuration
+    tool_response_cache.invalidate_tool(tool_id)
+    tool_circuit_breakers.reset(tool_id)
     
     return tool
 
@@ -115,4 +119,7 @@ def delete_tool(
     db.delete(tool)
     db.commit()
     
+    tool_response_cache.invalidate_tool(tool_id)
+    tool_circuit_breakers.reset(tool_id)
+    
     return {"message": "Tool deleted successfully"}
\ No newline at end of file
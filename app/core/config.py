@@ -4,6 +4,30 @@ import os
 
 class Settings(BaseSettings):
     database_url: str
+    # Async driver URL (e.g. mssql+aioodbc://...); derived from database_url when empty
+    async_database_url: Optional[str] = None
+    
+    # Connection pool per engine and worker: pool_size persistent + max_overflow extra connections
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a connection before failing
+    db_pool_recycle: int = 1800  # seconds before a connection is replaced (-1 never)
+    db_pool_pre_ping: bool = True
+    
+    # Send executemany parameter sets in one round trip (mssql+pyodbc only)
+    db_fast_executemany: bool = True
+    
+    # Config hot reload (seconds): shared version counter poll, periodic delta reload and full reload.
+    # Each poll is one query per worker; writes on the same worker reload immediately.
+    config_version_poll_interval: float = 2.0
+    config_reload_interval: float = 30.0
+    config_full_reload_interval: float = 300.0
+    
+    # Read replica for reporting and listing endpoints; reads go to the primary while it lags more than the bound
+    read_replica_url: Optional[str] = None
+    async_read_replica_url: Optional[str] = None  # derived from read_replica_url when empty
+    read_replica_max_lag_seconds: float = 30.0
+    read_replica_check_interval: float = 5.0  # seconds between heartbeat writes and lag checks
     openai_api_key: str
     secret_key: str
     encryption_key: str
@@ -16,6 +40,37 @@ class Settings(BaseSettings):
     
     rate_limit_per_minute: int = 60
     
+    # JSON backend for responses and tool payloads: auto, orjson or json
+    json_backend: str = "auto"
+    
+    # How long a compiled prompt template is trusted before reloading it
+    prompt_cache_ttl_seconds: int = 60
+    
+    # Maximum variable sets accepted by a batch render request
+    prompt_batch_max_items: int = 10000
+    
+    # Price of provider-cached prompt tokens relative to regular tokens
+    cached_token_price_factor: float = 0.5
+    
+    # Conversation history kept verbatim in the prompt; older turns are summarized by the agent's models
+    conversation_history_token_budget: int = 2000
+    
+    # Context window assumed for models not in the known list (per agent override: Agent.context_window_tokens)
+    default_context_window_tokens: int = 4096
+    
+    # Hedged LLM requests: p95 over the last executions, once enough samples exist
+    hedging_sample_size: int = 100
+    hedging_min_samples: int = 20
+    
+    # Tool response cache (shared by all cache-enabled tools in a worker)
+    tool_cache_max_bytes: int = 64 * 1024 * 1024
+    
+    # Upper bound for the jittered backoff between tool retries
+    tool_retry_max_backoff_ms: int = 5000
+    
+    # Default cap on tool response bodies (per tool override: Tool.max_response_bytes)
+    tool_max_response_bytes: int = 10 * 1024 * 1024
+    
     class Config:
         env_file = ".env"
 
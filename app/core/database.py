@@ -1,15 +1,109 @@
+from typing import Any, Dict, Optional
+from fastapi import Depends
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.utils.pool_metrics import PoolStats, instrumented_pool_class, track_pool_events
+from app.utils.replica_lag import ReplicaLag
+
+# Async driver used for each sync driver when no async_database_url is configured
+ASYNC_DRIVERS = {
+    "mssql": "mssql+aioodbc",
+    "mssql+pyodbc": "mssql+aioodbc",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite"
+}
+
+def get_async_database_url(database_url: str, async_database_url: Optional[str] = None) -> str:
+    """Async URL for the same database, derived from the sync one unless given"""
+    if async_database_url:
+        return async_database_url
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+def uses_configured_pool(database_url) -> bool:
+    """SQLite keeps its own single-file pooling; other backends use the db_pool_* settings"""
+    return make_url(database_url).get_backend_name() != "sqlite"
+
+def get_pool_options(database_url: str, pool_class, stats: PoolStats) -> Dict[str, Any]:
+    """Pool settings for an engine, timed by stats"""
+    if not uses_configured_pool(database_url):
+        return {}
+    return {
+        "poolclass": instrumented_pool_class(pool_class, stats),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping
+    }
+
+def get_driver_options(database_url: str) -> Dict[str, Any]:
+    """Options only some DBAPI drivers accept"""
+    if make_url(database_url).drivername == "mssql+pyodbc" and settings.db_fast_executemany:
+        return {"fast_executemany": True}
+    return {}
+
+# Pool statistics per engine, fed by the instrumented pools and the pool events
+engine_pool_stats = PoolStats()
+async_engine_pool_stats = PoolStats()
+read_engine_pool_stats = PoolStats()
+async_read_engine_pool_stats = PoolStats()
 
 engine = create_engine(
     settings.database_url,
-    echo=settings.debug
+    echo=settings.debug,
+    **get_pool_options(settings.database_url, QueuePool, engine_pool_stats),
+    **get_driver_options(settings.database_url)
 )
+track_pool_events(engine, engine_pool_stats)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+_async_database_url = get_async_database_url(settings.database_url, settings.async_database_url)
+
+async_engine = create_async_engine(
+    _async_database_url,
+    echo=settings.debug,
+    **get_pool_options(_async_database_url, AsyncAdaptedQueuePool, async_engine_pool_stats)
+)
+track_pool_events(async_engine.sync_engine, async_engine_pool_stats)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+# Optional read replica; None when read_replica_url is not set
+read_engine = None
+async_read_engine = None
+ReadSessionLocal = None
+AsyncReadSessionLocal = None
+
+if settings.read_replica_url:
+    read_engine = create_engine(
+        settings.read_replica_url,
+        echo=settings.debug,
+        **get_pool_options(settings.read_replica_url, QueuePool, read_engine_pool_stats)
+    )
+    track_pool_events(read_engine, read_engine_pool_stats)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    
+    _async_read_replica_url = get_async_database_url(settings.read_replica_url, settings.async_read_replica_url)
+    async_read_engine = create_async_engine(
+        _async_read_replica_url,
+        echo=settings.debug,
+        **get_pool_options(_async_read_replica_url, AsyncAdaptedQueuePool, async_read_engine_pool_stats)
+    )
+    track_pool_events(async_read_engine.sync_engine, async_read_engine_pool_stats)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    )
+
+# Measured by the replica monitor; reads fall back to the primary while it is stale
+replica_lag = ReplicaLag(settings.read_replica_max_lag_seconds)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,4 +111,35 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_session_factory() -> sessionmaker:
+    """Session factory for work that outlives the request's own session (thread pool, background tasks)"""
+    return SessionLocal
+
+def get_read_db(primary: Session = Depends(get_db)):
+    """
+    Session for read-only endpoints: the replica while it is within the
+    staleness bound, otherwise the primary session (created lazily, so it
+    costs no connection when unused).
+    """
+    if ReadSessionLocal is None or not replica_lag.is_fresh():
+        yield primary
+        return
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(primary: AsyncSession = Depends(get_async_db)):
+    """get_read_db for async endpoints"""
+    if AsyncReadSessionLocal is None or not replica_lag.is_fresh():
+        yield primary
+        return
+    async with AsyncReadSessionLocal() as db:
+        yield db
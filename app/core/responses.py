@@ -0,0 +1,9 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+from app.utils import fast_json
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the configured fast JSON backend"""
+
+    def render(self, content: Any) -> bytes:
+        return fast_json.dumps_bytes(content)
@@ -4,20 +4,44 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import time
+from contextlib import asynccontextmanager
 
 from app.api.router import api_router
 from app.core.config import settings
 from app.core.database import engine
+from app.core.responses import FastJSONResponse
 from app.models import *  # Import all models to ensure they are registered
 from app.services.config_service import config_service
+from app.services.replica_monitor import replica_monitor
+from app.utils import fast_json
 
 # Create database tables
 from app.core.database import Base
 Base.metadata.create_all(bind=engine)
 
+# Select the JSON backend used by responses and tool payloads
+fast_json.set_backend(settings.json_backend)
+
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the first snapshot before serving; reads never reload on demand
+    await config_service.areload_config()
+    
+    # Start configuration hot reload if enabled
+    if config_service.is_hot_reload_enabled():
+        config_service.start_hot_reload()
+    
+    # Measure read replica lag; until the first check, reads use the primary
+    replica_monitor.start()
+    
+    yield
+    
+    await replica_monitor.stop()
+    await config_service.stop_hot_reload()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
@@ -25,7 +49,9 @@ app = FastAPI(
     version="1.0.0",
     openapi_url="/api/v1/openapi.json",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Add rate limiting
@@ -53,16 +79,6 @@ async def add_process_time_header(request: Request, call_next):
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
-# Start configuration hot reload if enabled
-@app.on_event("startup")
-async def startup_event():
-    if config_service.is_hot_reload_enabled():
-        config_service.start_hot_reload()
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    config_service.stop_hot_reload()
-
 # Health check endpoint
 @app.get("/health")
 @limiter.limit("30/minute")
@@ -4,10 +4,12 @@ from .tool import Tool
 from .execution import Execution
 from .cost import Cost
 from .api_key import APIKey
-from .system_config import SystemConfig
+from .system_config import SystemConfig, SystemConfigVersion
 from .encrypted_credentials import EncryptedCredentials
 from .prompt_template import PromptTemplate
 from .agent_tools import AgentTool
+from .conversation import Conversation, ConversationMessage
+from .replica_heartbeat import ReplicaHeartbeat
 
 __all__ = [
     "User",
@@ -17,7 +19,11 @@ __all__ = [
     "Cost",
     "APIKey",
     "SystemConfig",
+    "SystemConfigVersion",
     "EncryptedCredentials",
     "PromptTemplate",
-    "AgentTool"
+    "AgentTool",
+    "Conversation",
+    "ConversationMessage",
+    "ReplicaHeartbeat"
 ]
\ No newline at end of file
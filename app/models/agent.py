@@ -5,19 +5,28 @@ from app.core.database import Base
 
 class Agent(Base):
     __tablename__ = "agents"
+    # Returned by the API right after save(): read server defaults back with OUTPUT / RETURNING
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     description = Column(String(500))
     system_prompt = Column(Text)
     personality = Column(Text)
+    prompt_template_id = Column(Integer, ForeignKey("prompt_templates.id"))  # Replaces system_prompt when set
+    prompt_template_variables = Column(Text)  # JSON with the fixed template variables
     model_name = Column(String(50), default="gpt-3.5-turbo")
+    model_routes = Column(Text)  # JSON list of {model_name, timeout_ms, max_cost}, tried in order
     temperature = Column(Numeric(3, 2), default=0.7)
     max_tokens = Column(Integer, default=1000)
+    context_window_tokens = Column(Integer)  # NULL uses the model's known window
+    truncation_strategy = Column(String(20), default="tail")  # head, tail, middle or reject
+    context_key_priority = Column(Text)  # JSON list of context keys, most important first
     top_p = Column(Numeric(3, 2), default=1.0)
     frequency_penalty = Column(Numeric(3, 2), default=0.0)
     presence_penalty = Column(Numeric(3, 2), default=0.0)
     rate_limit_per_minute = Column(Integer, default=10)
+    hedging_enabled = Column(Boolean, default=False)  # Duplicate LLM calls slower than the agent's p95
     is_active = Column(Boolean, default=True)
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, server_default=func.getutcdate())
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+    # Returned by the API right after save(): read server defaults back with OUTPUT / RETURNING
+    __mapper_args__ = {"eager_defaults": True}
+    
+    id = Column(Integer, primary_key=True, index=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    summary = Column(Text)  # Compacted summary of the turns marked as summarized
+    summary_tokens = Column(Integer, default=0)
+    created_at = Column(DateTime, server_default=func.getutcdate())
+    updated_at = Column(DateTime, server_default=func.getutcdate(), onupdate=func.getutcdate())
+    
+    # Relationships
+    agent = relationship("Agent")
+    user = relationship("User")
+    messages = relationship(
+        "ConversationMessage",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        order_by="ConversationMessage.id"
+    )
+    executions = relationship("Execution", back_populates="conversation")
+
+class ConversationMessage(Base):
+    __tablename__ = "conversation_messages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False, index=True)
+    execution_id = Column(Integer, ForeignKey("executions.id"))
+    role = Column(String(20), nullable=False)  # user, assistant
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer, default=0)
+    is_summarized = Column(Boolean, default=False)  # Folded into Conversation.summary
+    created_at = Column(DateTime, server_default=func.getutcdate())
+    
+    # Relationships
+    conversation = relationship("Conversation", back_populates="messages")
@@ -16,6 +16,7 @@ class Cost(Base):
     currency = Column(String(3), default="USD")
     tokens_input = Column(Integer, default=0)
     tokens_output = Column(Integer, default=0)
+    tokens_cached = Column(Integer, default=0)  # Input tokens served from the provider's prompt cache
     description = Column(String(500))
     created_at = Column(DateTime, server_default=func.getutcdate())
     
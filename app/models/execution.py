@@ -5,12 +5,16 @@ from app.core.database import Base
 
 class Execution(Base):
     __tablename__ = "executions"
+    # Returned by the API right after save(): read server defaults back with OUTPUT / RETURNING
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     agent_id = Column(Integer, ForeignKey("agents.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
+    conversation_id = Column(Integer, ForeignKey("conversations.id"))
     input_data = Column(Text)
     output_data = Column(Text)
+    model_name = Column(String(50))  # Model that actually served the request
     status = Column(String(20), default="pending")  # pending, running, completed, failed
     execution_time_ms = Column(Integer)
     tokens_used = Column(Integer)
@@ -23,4 +27,5 @@ class Execution(Base):
     # Relationships
     agent = relationship("Agent", back_populates="executions")
     user = relationship("User", back_populates="executions")
+    conversation = relationship("Conversation", back_populates="executions")
     costs = relationship("Cost", back_populates="execution", cascade="all, delete-orphan")
\ No newline at end of file
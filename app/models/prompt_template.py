@@ -5,6 +5,8 @@ from app.core.database import Base
 
 class PromptTemplate(Base):
     __tablename__ = "prompt_templates"
+    # Returned by the API right after save(): read server defaults back with OUTPUT / RETURNING
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, DateTime
+from app.core.database import Base
+
+class ReplicaHeartbeat(Base):
+    """Single-row timestamp written on the primary; its age on the read replica is the replication lag"""
+    __tablename__ = "replica_heartbeat"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Always 1
+    beat_at = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Text
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -11,4 +11,11 @@ class SystemConfig(Base):
     description = Column(String(500))
     is_encrypted = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.getutcdate())
-    updated_at = Column(DateTime, server_default=func.getutcdate(), onupdate=func.getutcdate())
\ No newline at end of file
+    updated_at = Column(DateTime, server_default=func.getutcdate(), onupdate=func.getutcdate(), index=True)
+
+class SystemConfigVersion(Base):
+    """Single-row counter bumped on every config write, polled by all workers"""
+    __tablename__ = "system_config_version"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Always 1
+    version = Column(BigInteger, nullable=False, default=0)
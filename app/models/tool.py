@@ -5,6 +5,8 @@ from app.core.database import Base
 
 class Tool(Base):
     __tablename__ = "tools"
+    # Returned by the API right after save(): read server defaults back with OUTPUT / RETURNING
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False)
@@ -15,6 +17,16 @@ class Tool(Base):
     requires_auth = Column(Boolean, default=False)
     cost_per_request = Column(Numeric(10, 6), default=0.0)
     timeout_seconds = Column(Integer, default=30)
+    max_response_bytes = Column(Integer)  # NULL uses the global default
+    cache_enabled = Column(Boolean, default=False)  # Cache GET responses
+    cache_ttl_seconds = Column(Integer, default=300)
+    cache_max_bytes = Column(Integer, default=1048576)
+    retry_max_attempts = Column(Integer, default=0)  # Retries for GET (and PUT/DELETE when idempotent_writes), 0 disables
+    retry_backoff_ms = Column(Integer, default=200)
+    idempotent_writes = Column(Boolean, default=False)  # PUT/DELETE on this endpoint are safe to repeat
+    circuit_error_threshold = Column(Numeric(3, 2), default=0)  # Error rate that opens the circuit, 0 disables
+    circuit_min_requests = Column(Integer, default=10)
+    circuit_open_seconds = Column(Integer, default=30)
     is_active = Column(Boolean, default=True)
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, server_default=func.getutcdate())
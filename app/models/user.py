@@ -5,6 +5,8 @@ from app.core.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    # Returned by the API right after save(): read server defaults back with OUTPUT / RETURNING
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
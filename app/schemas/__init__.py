@@ -5,6 +5,7 @@ from .auth import Token, TokenData
 from .execution import Execution, ExecutionCreate
 from .cost import Cost, CostCreate
 from .prompt_template import PromptTemplate, PromptTemplateCreate, PromptTemplateUpdate
+from .conversation import Conversation, ConversationDetail, ConversationMessage
 
 __all__ = [
     "User", "UserCreate", "UserUpdate",
@@ -13,5 +14,6 @@ __all__ = [
     "Token", "TokenData",
     "Execution", "ExecutionCreate",
     "Cost", "CostCreate",
-    "PromptTemplate", "PromptTemplateCreate", "PromptTemplateUpdate"
+    "PromptTemplate", "PromptTemplateCreate", "PromptTemplateUpdate",
+    "Conversation", "ConversationDetail", "ConversationMessage"
 ]
\ No newline at end of file
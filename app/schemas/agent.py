@@ -1,21 +1,53 @@
-from typing import Optional, Dict, Any
-from pydantic import BaseModel
+import json
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, field_validator
 from datetime import datetime
 from decimal import Decimal
+from app.utils.context_budget import TRUNCATION_STRATEGIES
+
+def _validate_truncation_strategy(value):
+    if value is not None and value not in TRUNCATION_STRATEGIES:
+        raise ValueError(f"truncation_strategy must be one of {', '.join(TRUNCATION_STRATEGIES)}")
+    return value
+
+class ModelRoute(BaseModel):
+    model_name: str
+    timeout_ms: Optional[int] = None  # Fall back to the next model after this long
+    max_cost: Optional[float] = None  # Skip this model when the request could cost more
 
 class AgentBase(BaseModel):
     name: str
     description: Optional[str] = None
     system_prompt: Optional[str] = None
     personality: Optional[str] = None
+    prompt_template_id: Optional[int] = None
+    prompt_template_variables: Optional[Dict[str, Any]] = {}
     model_name: str = "gpt-3.5-turbo"
+    model_routes: Optional[List[ModelRoute]] = []  # Replaces model_name when set
     temperature: Decimal = Decimal("0.7")
     max_tokens: int = 1000
+    context_window_tokens: Optional[int] = None
+    truncation_strategy: str = "tail"
+    context_key_priority: Optional[List[str]] = []
     top_p: Decimal = Decimal("1.0")
     frequency_penalty: Decimal = Decimal("0.0")
     presence_penalty: Decimal = Decimal("0.0")
     rate_limit_per_minute: int = 10
+    hedging_enabled: bool = False
     is_active: bool = True
+    
+    @field_validator("prompt_template_variables", "context_key_priority", "model_routes", mode="before")
+    @classmethod
+    def parse_json_fields(cls, value):
+        # Stored as JSON text on the model
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+    
+    @field_validator("truncation_strategy")
+    @classmethod
+    def validate_truncation_strategy(cls, value):
+        return _validate_truncation_strategy(value)
 
 class AgentCreate(AgentBase):
     tool_ids: Optional[list[int]] = []
@@ -25,19 +57,32 @@ class AgentUpdate(BaseModel):
     description: Optional[str] = None
     system_prompt: Optional[str] = None
     personality: Optional[str] = None
+    prompt_template_id: Optional[int] = None
+    prompt_template_variables: Optional[Dict[str, Any]] = None
     model_name: Optional[str] = None
+    model_routes: Optional[List[ModelRoute]] = None
     temperature: Optional[Decimal] = None
     max_tokens: Optional[int] = None
+    context_window_tokens: Optional[int] = None
+    truncation_strategy: Optional[str] = None
+    context_key_priority: Optional[List[str]] = None
     top_p: Optional[Decimal] = None
     frequency_penalty: Optional[Decimal] = None
     presence_penalty: Optional[Decimal] = None
     rate_limit_per_minute: Optional[int] = None
+    hedging_enabled: Optional[bool] = None
     is_active: Optional[bool] = None
     tool_ids: Optional[list[int]] = None
+    
+    @field_validator("truncation_strategy")
+    @classmethod
+    def validate_truncation_strategy(cls, value):
+        return _validate_truncation_strategy(value)
 
 class AgentExecute(BaseModel):
     input_message: str
     context: Optional[Dict[str, Any]] = {}
+    conversation_id: Optional[int] = None  # Keep history server-side in this conversation
 
 class Agent(AgentBase):
     id: int
@@ -0,0 +1,29 @@
+from typing import Optional, List
+from pydantic import BaseModel
+from datetime import datetime
+
+class ConversationMessage(BaseModel):
+    id: int
+    execution_id: Optional[int] = None
+    role: str
+    content: str
+    token_count: int = 0
+    is_summarized: bool = False
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class Conversation(BaseModel):
+    id: int
+    agent_id: int
+    user_id: int
+    summary: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ConversationDetail(Conversation):
+    messages: List[ConversationMessage] = []
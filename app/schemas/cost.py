@@ -9,6 +9,7 @@ class CostBase(BaseModel):
     currency: str = "USD"
     tokens_input: int = 0
     tokens_output: int = 0
+    tokens_cached: int = 0
     description: Optional[str] = None
 
 class CostCreate(CostBase):
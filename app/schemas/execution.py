@@ -1,18 +1,33 @@
 from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, AliasChoices, Field, field_validator
 from datetime import datetime
 from decimal import Decimal
+from app.utils import fast_json
 
 class ExecutionBase(BaseModel):
     agent_id: int
     input_data: str
     output_data: Optional[str] = None
+    model_name: Optional[str] = None
     status: str = "pending"
     execution_time_ms: Optional[int] = None
     tokens_used: Optional[int] = None
     cost: Decimal = Decimal("0.0")
     error_message: Optional[str] = None
-    metadata: Optional[Dict[str, Any]] = {}
+    # Stored as JSON text in Execution.execution_metadata
+    metadata: Optional[Dict[str, Any]] = Field(
+        default={},
+        validation_alias=AliasChoices("execution_metadata", "metadata")
+    )
+    
+    @field_validator("metadata", mode="before")
+    @classmethod
+    def parse_metadata(cls, value):
+        if value is None:
+            return {}
+        if isinstance(value, (str, bytes)):
+            return fast_json.loads(value)
+        return value
 
 class ExecutionCreate(BaseModel):
     agent_id: int
@@ -21,6 +36,7 @@ class ExecutionCreate(BaseModel):
 class Execution(ExecutionBase):
     id: int
     user_id: int
+    conversation_id: Optional[int] = None
     started_at: datetime
     completed_at: Optional[datetime] = None
     
@@ -12,6 +12,16 @@ class ToolBase(BaseModel):
     requires_auth: bool = False
     cost_per_request: Decimal = Decimal("0.0")
     timeout_seconds: int = 30
+    max_response_bytes: Optional[int] = None
+    cache_enabled: bool = False
+    cache_ttl_seconds: int = 300
+    cache_max_bytes: int = 1048576
+    retry_max_attempts: int = 0
+    retry_backoff_ms: int = 200
+    idempotent_writes: bool = False
+    circuit_error_threshold: Decimal = Decimal("0")
+    circuit_min_requests: int = 10
+    circuit_open_seconds: int = 30
     is_active: bool = True
 
 class ToolCreate(ToolBase):
@@ -26,6 +36,16 @@ class ToolUpdate(BaseModel):
     requires_auth: Optional[bool] = None
     cost_per_request: Optional[Decimal] = None
     timeout_seconds: Optional[int] = None
+    max_response_bytes: Optional[int] = None
+    cache_enabled: Optional[bool] = None
+    cache_ttl_seconds: Optional[int] = None
+    cache_max_bytes: Optional[int] = None
+    retry_max_attempts: Optional[int] = None
+    retry_backoff_ms: Optional[int] = None
+    idempotent_writes: Optional[bool] = None
+    circuit_error_threshold: Optional[Decimal] = None
+    circuit_min_requests: Optional[int] = None
+    circuit_open_seconds: Optional[int] = None
     is_active: Optional[bool] = None
 
 class Tool(ToolBase):
@@ -1,29 +1,75 @@
 import json
+import math
 import time
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
 from app.models.agent import Agent
 from app.models.execution import Execution
 from app.models.cost import Cost
 from app.models.user import User
+from app.models.conversation import Conversation
 from app.services.tool_service import ToolService
 from app.services.cost_service import CostService
+from app.services.prompt_service import PromptService
+from app.services.conversation_service import ConversationService
+from app.services.model_router import ModelRouter, RoutedResponse, get_model_routes
 from app.core.config import settings
+from app.utils import fast_json
+from app.utils.persistence import save
+from app.utils.tokens import estimate_tokens, get_token_usage
+from app.utils.context_budget import (
+    MODEL_CONTEXT_WINDOWS,
+    BudgetResult,
+    ContextBudgetExceeded,
+    fit_context_budget,
+    message_tokens,
+    serialize_context
+)
+
+class SystemMessageCache:
+    """Rendered system messages per agent, tagged with the config version they were built from"""
+    
+    def __init__(self):
+        self._entries: Dict[int, Tuple[Tuple, Optional[str]]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, agent_id: int, version: Tuple) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            entry = self._entries.get(agent_id)
+        if entry is not None and entry[0] == version:
+            return True, entry[1]
+        return False, None
+    
+    def put(self, agent_id: int, version: Tuple, content: Optional[str]):
+        with self._lock:
+            self._entries[agent_id] = (version, content)
+    
+    def invalidate(self, agent_id: int):
+        with self._lock:
+            self._entries.pop(agent_id, None)
+
+# Conversations being compacted by this worker; a second request skips instead of summarizing twice
+_compacting_conversations = set()
+_compacting_lock = threading.Lock()
 
 class AgentService:
     def __init__(self, db: Session):
         self.db = db
         self.tool_service = ToolService(db)
         self.cost_service = CostService(db)
+        self.prompt_service = PromptService(db)
+        self.conversation_service = ConversationService(db)
+        self.model_router = ModelRouter(self._calculate_cost)
     
     def execute_agent(
         self, 
         agent_id: int, 
         user: User, 
         input_message: str, 
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        conversation_id: Optional[int] = None
     ) -> Execution:
         agent = self.db.query(Agent).filter(Agent.id == agent_id).first()
         if not agent:
@@ -32,92 +78,337 @@ class AgentService:
         if not agent.is_active:
             raise ValueError(f"Agent {agent.name} is not active")
         
+        conversation = None
+        if conversation_id is not None:
+            conversation = self.conversation_service.get_conversation(conversation_id, user.id, agent_id)
+        
+        # A prompt that cannot fit the model window is rejected before any
+        # execution is recorded; other prompt errors fail the execution below
+        prompt_error = None
+        try:
+            messages, budget = self.build_messages(agent, input_message, context, conversation)
+        except ContextBudgetExceeded:
+            raise
+        except Exception as e:
+            prompt_error = e
+        
         execution = Execution(
             agent_id=agent_id,
             user_id=user.id,
+            conversation_id=conversation_id,
             input_data=input_message,
             status="running"
         )
-        self.db.add(execution)
-        self.db.commit()
-        self.db.refresh(execution)
+        save(self.db, execution)
+        
+        # Cost rows of this execution, inserted together before the final commit
+        pending_costs: List[Dict[str, Any]] = []
         
         try:
+            if prompt_error:
+                raise prompt_error
+            
             start_time = time.time()
             
-            # Initialize OpenAI LLM with agent configuration
-            llm = ChatOpenAI(
-                model_name=agent.model_name,
-                temperature=float(agent.temperature),
-                max_tokens=agent.max_tokens,
-                top_p=float(agent.top_p),
-                frequency_penalty=float(agent.frequency_penalty),
-                presence_penalty=float(agent.presence_penalty),
-                openai_api_key=settings.openai_api_key
+            # Call the agent's models in order, falling back on timeouts and rate limits
+            routed = self.model_router.invoke(
+                agent, messages, budget.prompt_tokens, hedge_after_ms=self._hedge_delay_ms(agent)
             )
-            
-            # Prepare messages
-            messages = []
-            
-            # Add system prompt if available
-            if agent.system_prompt:
-                system_content = agent.system_prompt
-                if agent.personality:
-                    system_content += f"\n\nPersonality: {agent.personality}"
-                messages.append(SystemMessage(content=system_content))
-            
-            # Add context if provided
-            if context:
-                context_message = f"Context: {json.dumps(context, indent=2)}"
-                messages.append(SystemMessage(content=context_message))
-            
-            # Add user input
-            messages.append(HumanMessage(content=input_message))
-            
-            # Execute the LLM call
-            response = llm(messages)
+            response = routed.response
+            model_name = routed.route.model_name
             
             # Calculate execution time
             execution_time_ms = int((time.time() - start_time) * 1000)
             
-            # Estimate cost (simplified - in production, use actual token counts)
-            tokens_used = self._estimate_tokens(input_message + response.content)
-            cost = self._calculate_cost(agent.model_name, tokens_used)
+            # Provider token counts, including prompt tokens served from its prefix cache
+            usage = self._get_token_usage(messages, response)
+            tokens_used = usage["input"] + usage["output"]
+            cost = self._calculate_cost(model_name, tokens_used, usage["cached"])
+            hedge_cost = self._record_hedge_costs(
+                agent, user, execution, routed, messages, budget.prompt_tokens, pending_costs
+            )
             
             # Update execution
             execution.output_data = response.content
+            execution.model_name = model_name
             execution.status = "completed"
             execution.execution_time_ms = execution_time_ms
             execution.tokens_used = tokens_used
-            execution.cost = cost
+            execution.cost = cost + hedge_cost
+            execution.execution_metadata = fast_json.dumps({
+                "model_name": model_name,
+                "model_fallbacks": routed.fallbacks,
+                "hedge": {
+                    "delay_ms": routed.hedge.delay_ms,
+                    "fired": routed.hedge.fired,
+                    "winner": routed.hedge.winner,
+                    "cost": hedge_cost
+                } if routed.hedge else None,
+                "tokens_input": usage["input"],
+                "tokens_output": usage["output"],
+                "tokens_cached": usage["cached"],
+                "context_dropped_keys": budget.dropped_context_keys,
+                "input_truncated": budget.input_truncated
+            })
             execution.completed_at = time.time()
             
             # Record cost
-            self.cost_service.record_cost(
+            pending_costs.append(self.cost_service.cost_row(
                 user_id=user.id,
                 agent_id=agent_id,
                 execution_id=execution.id,
                 cost_type="llm_call",
                 amount=cost,
-                tokens_input=len(input_message.split()),  # Simplified
-                tokens_output=len(response.content.split()),  # Simplified
-                description=f"LLM call for agent {agent.name}"
-            )
+                tokens_input=usage["input"],
+                tokens_output=usage["output"],
+                tokens_cached=usage["cached"],
+                description=f"LLM call for agent {agent.name} ({model_name})"
+            ))
+            
+            # Compaction runs after the response (compact_conversation)
+            if conversation:
+                self.conversation_service.append_turn(
+                    conversation, execution.id, execution.input_data, response.content
+                )
             
         except Exception as e:
             execution.status = "failed"
             execution.error_message = str(e)
             execution.completed_at = time.time()
         
-        self.db.commit()
-        self.db.refresh(execution)
+        # Costs already incurred are kept even when a later step failed
+        self.cost_service.record_costs(pending_costs, commit=False)
+        save(self.db, execution)
         return execution
     
+    def build_messages(
+        self,
+        agent: Agent,
+        input_message: str,
+        context: Optional[Dict[str, Any]] = None,
+        conversation: Optional[Conversation] = None
+    ) -> Tuple[List[BaseMessage], BudgetResult]:
+        """
+        Assemble the LLM messages, most stable content first, within the
+        agent's context window.
+        
+        The system message is byte-identical across calls for the same agent
+        config, followed by the conversation history (which only grows at the
+        end between compactions). Context is serialized deterministically
+        (sorted, compact) after them, so providers can reuse their cached
+        prompt prefix. Context keys and input are cut by the agent's
+        truncation policy when the prompt would not fit.
+        
+        Raises:
+            ContextBudgetExceeded: if the prompt cannot fit the window
+        """
+        messages = []
+        
+        # Add system prompt if available (precomputed per agent config version)
+        system_content = self.get_system_message(agent)
+        if system_content:
+            messages.append(SystemMessage(content=system_content))
+        
+        # Add server-side conversation history (summary + recent turns)
+        if conversation:
+            messages.extend(self.conversation_service.build_history_messages(conversation))
+        
+        fixed_tokens = sum(message_tokens(message.content, agent.model_name) for message in messages)
+        budget = fit_context_budget(
+            input_message,
+            context,
+            self._available_prompt_tokens(agent, fixed_tokens),
+            strategy=agent.truncation_strategy or "tail",
+            key_priority=json.loads(agent.context_key_priority or "[]"),
+            model_name=agent.model_name
+        )
+        
+        budget.prompt_tokens += fixed_tokens
+        
+        # Add context if provided
+        if budget.context:
+            messages.append(SystemMessage(content=f"Context: {serialize_context(budget.context)}"))
+        
+        # Add user input
+        messages.append(HumanMessage(content=budget.input_message))
+        
+        return messages, budget
+    
+    def _available_prompt_tokens(self, agent: Agent, fixed_tokens: int) -> int:
+        """
+        Window left for context and input after the completion and the fixed
+        prefix. With several models routed, the smallest window applies so
+        any fallback can take the same prompt.
+        """
+        window = agent.context_window_tokens or min(
+            MODEL_CONTEXT_WINDOWS.get(route.model_name, settings.default_context_window_tokens)
+            for route in get_model_routes(agent)
+        )
+        available = window - (agent.max_tokens or 0) - fixed_tokens
+        if available <= 0:
+            raise ContextBudgetExceeded(
+                f"System prompt and history of agent {agent.name} need {fixed_tokens} tokens, "
+                f"leaving no room in its {window}-token window"
+            )
+        return available
+    
+    def _hedge_delay_ms(self, agent: Agent) -> Optional[int]:
+        """
+        p95 of the agent's recent completed executions, or None when hedging
+        is off or there are too few samples to trust the percentile.
+        """
+        if not agent.hedging_enabled:
+            return None
+        
+        rows = self.db.query(Execution.execution_time_ms).filter(
+            Execution.agent_id == agent.id,
+            Execution.status == "completed",
+            Execution.execution_time_ms != None
+        ).order_by(Execution.id.desc()).limit(settings.hedging_sample_size).all()
+        
+        if len(rows) < settings.hedging_min_samples:
+            return None
+        
+        latencies = sorted(row[0] for row in rows)
+        return latencies[math.ceil(len(latencies) * 0.95) - 1]
+    
+    def _record_hedge_costs(
+        self,
+        agent: Agent,
+        user: User,
+        execution: Execution,
+        routed: RoutedResponse,
+        messages: List[BaseMessage],
+        prompt_tokens: int,
+        pending_costs: List[Dict[str, Any]]
+    ) -> float:
+        """
+        Add the cost of requests that lost a hedged race to pending_costs. A
+        request cancelled in flight is charged for its prompt, which the
+        provider may already have processed.
+        """
+        if not routed.hedge:
+            return 0.0
+        
+        model_name = routed.route.model_name
+        total = 0.0
+        for response in routed.hedge.losers:
+            if response is None:
+                usage = {"input": prompt_tokens, "output": 0, "cached": 0}
+            else:
+                usage = self._get_token_usage(messages, response)
+            amount = self._calculate_cost(model_name, usage["input"] + usage["output"], usage["cached"])
+            total += amount
+            
+            pending_costs.append(self.cost_service.cost_row(
+                user_id=user.id,
+                agent_id=agent.id,
+                execution_id=execution.id,
+                cost_type="llm_hedge",
+                amount=amount,
+                tokens_input=usage["input"],
+                tokens_output=usage["output"],
+                tokens_cached=usage["cached"],
+                description=f"Hedged LLM call for agent {agent.name} ({model_name})"
+            ))
+        
+        return total
+    
+    def compact_conversation(self, agent_id: int, conversation_id: int, user_id: int, execution_id: int):
+        """
+        Fold old turns of a conversation into its summary with the agent's own
+        models. Meant to run after the execution response was sent; a failed
+        summary is logged and retried after the next turn.
+        """
+        with _compacting_lock:
+            if conversation_id in _compacting_conversations:
+                return
+            _compacting_conversations.add(conversation_id)
+        
+        try:
+            agent = self.db.query(Agent).filter(Agent.id == agent_id).first()
+            conversation = self.db.query(Conversation).filter(Conversation.id == conversation_id).first()
+            if not agent or not conversation:
+                return
+            
+            compaction = self.conversation_service.summary_prompt(conversation)
+            if compaction is None:
+                return
+            prompt, folded = compaction
+            
+            prompt_tokens = sum(message_tokens(message.content) for message in prompt)
+            routed = self.model_router.invoke(agent, prompt, prompt_tokens)
+            usage = self._get_token_usage(prompt, routed.response)
+            model_name = routed.route.model_name
+            
+            self.conversation_service.apply_summary(conversation, folded, routed.response.content)
+            self.cost_service.record_costs([self.cost_service.cost_row(
+                user_id=user_id,
+                agent_id=agent.id,
+                execution_id=execution_id,
+                cost_type="conversation_summary",
+                amount=self._calculate_cost(model_name, usage["input"] + usage["output"], usage["cached"]),
+                tokens_input=usage["input"],
+                tokens_output=usage["output"],
+                tokens_cached=usage["cached"],
+                description=f"Conversation {conversation.id} summary for agent {agent.name} ({model_name})"
+            )], commit=False)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            print(f"Error summarizing conversation {conversation_id}: {e}")
+        finally:
+            with _compacting_lock:
+                _compacting_conversations.discard(conversation_id)
+    
+    def get_system_message(self, agent: Agent) -> Optional[str]:
+        """
+        Get the agent's system message, rendering it only when the agent or
+        its prompt template changed since the last call.
+        
+        When the agent references a prompt template, the template rendered with
+        the agent's fixed variables replaces system_prompt.
+        """
+        template = None
+        if agent.prompt_template_id:
+            template = self.prompt_service.get_cached_template(agent.prompt_template_id)
+            if not template or not template.is_active:
+                raise ValueError(
+                    f"Prompt template {agent.prompt_template_id} of agent {agent.name} not found or inactive"
+                )
+        
+        version = (
+            agent.updated_at,
+            agent.system_prompt,
+            agent.personality,
+            agent.prompt_template_variables
+        )
+        if template:
+            version += (template.id, template.version, template.loaded_at)
+        
+        found, system_content = system_message_cache.get(agent.id, version)
+        if found:
+            return system_content
+        
+        if template:
+            variables = json.loads(agent.prompt_template_variables or "{}")
+            system_content = self.prompt_service.render_template(template.id, variables)
+        else:
+            system_content = agent.system_prompt
+        
+        if system_content and agent.personality:
+            system_content += f"\n\nPersonality: {agent.personality}"
+        
+        system_message_cache.put(agent.id, version, system_content)
+        return system_content
+    
+    def _get_token_usage(self, messages: List[BaseMessage], response: BaseMessage) -> Dict[str, int]:
+        return get_token_usage(messages, response)
+    
     def _estimate_tokens(self, text: str) -> int:
-        # Simplified token estimation - in production, use tiktoken
-        return len(text.split()) * 1.3  # Rough approximation
+        return estimate_tokens(text)
     
-    def _calculate_cost(self, model_name: str, tokens: int) -> float:
+    def _calculate_cost(self, model_name: str, tokens: int, cached_tokens: int = 0) -> float:
         # Simplified cost calculation - update with actual OpenAI pricing
         cost_per_1k_tokens = {
             "gpt-4": 0.03,
@@ -126,7 +417,11 @@ class AgentService:
         }
         
         rate = cost_per_1k_tokens.get(model_name, 0.002)
-        return (tokens / 1000) * rate
+        
+        # Prompt tokens read from the provider's prefix cache are billed at a discount
+        cached_tokens = min(cached_tokens, tokens)
+        billable = (tokens - cached_tokens) + cached_tokens * settings.cached_token_price_factor
+        return (billable / 1000) * rate
     
     def get_agent_tools(self, agent_id: int) -> List[Dict[str, Any]]:
         """Get all tools available to an agent"""
@@ -146,4 +441,7 @@ class AgentService:
                 }
                 tools.append(tool_config)
         
-        return tools
\ No newline at end of file
+        return tools
+
+# Global instance
+system_message_cache = SystemMessageCache()
\ No newline at end of file
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("true", "1", "yes", "on"):
+            return True
+        if lowered in ("false", "0", "no", "off"):
+            return False
+    raise ValueError(f"expected a boolean, got {value!r}")
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"expected an integer, got {value!r}")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"expected an integer, got {value!r}")
+    return int(value)
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ValueError(f"expected a number, got {value!r}")
+    return float(value)
+
+_CONVERTERS: Dict[type, Callable[[Any], Any]] = {
+    bool: _to_bool,
+    int: _to_int,
+    float: _to_float,
+    str: str
+}
+
+@dataclass(frozen=True)
+class ConfigKey:
+    name: str
+    type: type
+    default: Any
+    validator: Optional[Callable[[Any], bool]] = None
+    description: str = ""
+
+    def convert(self, value: Any) -> Any:
+        """Convert a raw stored value, raising ValueError if it is invalid"""
+        converted = _CONVERTERS.get(self.type, self.type)(value)
+        if self.validator and not self.validator(converted):
+            raise ValueError(f"{converted!r} is not a valid value for {self.name}")
+        return converted
+
+class TypedConfig:
+    """Converted values of the declared keys, read as attributes"""
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: Dict[str, Any]):
+        object.__setattr__(self, "_values", values)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"Config key '{name}' is not declared") from None
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("TypedConfig is read-only")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self._values)
+
+class ConfigRegistry:
+    """
+    Declared configuration keys with their type, default and validator.
+
+    Raw values are converted once per reload; a bad value is reported at
+    reload time and the key keeps its last valid value (or its default).
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, ConfigKey] = {}
+
+    def register(
+        self,
+        name: str,
+        type: type,
+        default: Any,
+        validator: Optional[Callable[[Any], bool]] = None,
+        description: str = ""
+    ) -> ConfigKey:
+        key = ConfigKey(name, type, default, validator, description)
+        self._keys[name] = key
+        return key
+
+    def get_key(self, name: str) -> Optional[ConfigKey]:
+        return self._keys.get(name)
+
+    def validate(self, name: str, value: Any):
+        """Raise ValueError if value is not acceptable for a declared key"""
+        key = self._keys.get(name)
+        if key:
+            key.convert(value)
+
+    def defaults(self) -> TypedConfig:
+        return TypedConfig({key.name: key.default for key in self._keys.values()})
+
+    def convert(
+        self,
+        raw: Mapping[str, Any],
+        previous: TypedConfig,
+        candidates: Optional[Iterable[str]] = None
+    ) -> Tuple[TypedConfig, Dict[str, str]]:
+        """
+        Build the typed view of raw values.
+
+        candidates limits the work to keys a delta reload touched; the other
+        keys are carried over from previous.
+
+        Returns:
+            The typed config and an error message per rejected key
+        """
+        values = previous.as_dict()
+        errors = {}
+        names = self._keys.keys() if candidates is None else [name for name in candidates if name in self._keys]
+
+        for name in names:
+            key = self._keys[name]
+            if name not in raw:
+                values[name] = key.default
+                continue
+            try:
+                values[name] = key.convert(raw[name])
+            except (TypeError, ValueError) as e:
+                errors[name] = str(e)
+
+        return TypedConfig(values), errors
+
+# Global instance
+config_registry = ConfigRegistry()
+
+config_registry.register(
+    "hot_reload_enabled", bool, True,
+    description="Enable hot reload of configuration changes"
+)
+config_registry.register(
+    "default_model", str, "gpt-3.5-turbo", validator=bool,
+    description="Default OpenAI model for new agents"
+)
+config_registry.register(
+    "max_agents_per_user", int, 10, validator=lambda value: value >= 0,
+    description="Maximum number of agents per user"
+)
+config_registry.register(
+    "max_executions_per_hour", int, 100, validator=lambda value: value >= 0,
+    description="Maximum executions per hour per user"
+)
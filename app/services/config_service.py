@@ -1,12 +1,43 @@
+import asyncio
 import json
 import threading
 import time
-from typing import Dict, Any, Optional
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Dict, Any, FrozenSet, Iterable, List, Mapping, Optional
+from sqlalchemy import BigInteger, cast, func, select
 from sqlalchemy.orm import Session
-from app.models.system_config import SystemConfig
-from app.core.database import SessionLocal
+from app.models.system_config import SystemConfig, SystemConfigVersion
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.services.config_registry import TypedConfig, config_registry
 from app.utils.encryption import encryption_util
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of the configuration; replaced as a whole, never mutated"""
+    values: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    loaded_at: float = 0
+    # Declared keys converted once per reload (see config_registry)
+    typed: TypedConfig = field(default_factory=config_registry.defaults)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+def _version_query():
+    return select(SystemConfigVersion.version).where(SystemConfigVersion.id == 1)
+
+def _aggregate_query():
+    """One row telling whether anything changed: row count, id checksum, last update"""
+    return select(
+        func.count(SystemConfig.id),
+        func.coalesce(func.sum(cast(SystemConfig.id, BigInteger)), 0),
+        func.max(SystemConfig.updated_at)
+    )
+
+# Called with the keys whose value changed (added, updated or deleted) and the new snapshot
+ConfigListener = Callable[[FrozenSet[str], ConfigSnapshot], None]
+
 class ConfigService:
     _instance = None
     _lock = threading.Lock()
@@ -21,80 +52,249 @@ class ConfigService:
     
     def __init__(self):
         if not self._initialized:
-            self._config_cache: Dict[str, Any] = {}
-            self._last_reload = 0
-            self._reload_interval = 30  # seconds
+            self._snapshot = ConfigSnapshot()
+            self._reload_interval = settings.config_reload_interval
+            self._full_reload_interval = settings.config_full_reload_interval
+            self._version_poll_interval = settings.config_version_poll_interval
+            self._version = None  # Last counter value whose writes are in the snapshot
+            # Delta reload state: last updated_at seen and the row count/id checksum at that point
+            self._watermark = None
+            self._row_count = 0
+            self._id_checksum = 0
+            self._last_full_reload = 0
+            self._reload_lock = threading.Lock()  # Serializes blocking reloads; reads never take it
+            self._areload_lock = asyncio.Lock()  # Serializes reloads on the event loop
+            self._loop = None
+            self._wake = None
+            self._listeners: List[ConfigListener] = []
             self._running = False
-            self._reload_thread = None
+            self._reload_task = None
             self._initialized = True
     
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        return self._snapshot
+    
+    @property
+    def typed(self) -> TypedConfig:
+        """Typed accessors for declared keys, e.g. config_service.typed.hot_reload_enabled"""
+        return self._snapshot.typed
+    
+    @property
+    def _last_reload(self) -> float:
+        return self._snapshot.loaded_at
+    
+    def subscribe(self, listener: ConfigListener):
+        """Call listener after each reload that changes at least one key"""
+        self._listeners = self._listeners + [listener]
+    
+    def unsubscribe(self, listener: ConfigListener):
+        self._listeners = [existing for existing in self._listeners if existing is not listener]
+    
     def start_hot_reload(self):
-        """Start the hot reload background thread"""
+        """Start the reloader as an asyncio task on the running event loop"""
         if not self._running:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
             self._running = True
-            self._reload_thread = threading.Thread(target=self._reload_loop, daemon=True)
-            self._reload_thread.start()
+            self._reload_task = asyncio.create_task(self._reload_loop())
             print("Hot reload configuration system started")
     
-    def stop_hot_reload(self):
-        """Stop the hot reload background thread"""
+    async def stop_hot_reload(self):
+        """Cancel the reloader task; returns as soon as any in-flight query is cancelled"""
         self._running = False
-        if self._reload_thread:
-            self._reload_thread.join()
+        if self._reload_task:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+            self._reload_task = None
             print("Hot reload configuration system stopped")
     
-    def _reload_loop(self):
-        """Background thread that periodically reloads configuration"""
+    async def _reload_loop(self):
+        """
+        Reload configuration when a local write wakes the task, when another
+        worker bumped the version counter, or every _reload_interval seconds.
+        """
         while self._running:
+            woken = False
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._version_poll_interval)
+                woken = True
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            
             try:
-                self.reload_config()
-                time.sleep(self._reload_interval)
+                due = time.time() - self._snapshot.loaded_at >= self._reload_interval
+                if woken or due or await self._remote_version() != self._version:
+                    await self.areload_config()
             except Exception as e:
                 print(f"Error in config reload loop: {e}")
-                time.sleep(self._reload_interval)
     
-    def reload_config(self):
-        """Reload configuration from database"""
-        db = SessionLocal()
-        try:
-            configs = db.query(SystemConfig).all()
+    async def _remote_version(self) -> Optional[int]:
+        """Current value of the shared counter (a primary key lookup)"""
+        async with AsyncSessionLocal() as session:
+            return (await session.execute(_version_query())).scalar()
+    
+    def _bump_version(self, db: Session):
+        """Tell the other workers to reload; runs in the caller's write transaction"""
+        updated = db.query(SystemConfigVersion).filter(SystemConfigVersion.id == 1).update(
+            {SystemConfigVersion.version: SystemConfigVersion.version + 1},
+            synchronize_session=False
+        )
+        if not updated:
+            db.add(SystemConfigVersion(id=1, version=1))
+    
+    async def areload_config(self, full: bool = False):
+        """
+        Reload configuration from database and publish it as a new snapshot.
+        
+        Only rows updated since the last watermark are read and decrypted; a
+        full reload happens on the first call, when full=True, when the row
+        count or id checksum shows a deletion, and every _full_reload_interval
+        seconds as a safety net for writes that bypass updated_at.
+        """
+        async with self._areload_lock:
+            try:
+                async with AsyncSessionLocal() as session:
+                    # Read before the rows: a write landing during this reload bumps it again
+                    version = (await session.execute(_version_query())).scalar()
+                    aggregate = (await session.execute(_aggregate_query())).one()
+                    full = self._needs_full_reload(full, aggregate)
+                    if not full and not self._has_changes(aggregate):
+                        self._mark_checked(version)
+                        return
+                    configs = (await session.execute(self._rows_query(full))).scalars().all()
+                    self._apply_reload(configs, full, aggregate, version)
+            except Exception as e:
+                print(f"Error reloading configuration: {e}")
+    
+    def reload_config(self, full: bool = False):
+        """Blocking variant of areload_config, for callers without an event loop"""
+        with self._reload_lock:
+            db = SessionLocal()
+            try:
+                version = db.execute(_version_query()).scalar()
+                aggregate = db.execute(_aggregate_query()).one()
+                full = self._needs_full_reload(full, aggregate)
+                if not full and not self._has_changes(aggregate):
+                    self._mark_checked(version)
+                    return
+                configs = db.execute(self._rows_query(full)).scalars().all()
+                self._apply_reload(configs, full, aggregate, version)
+            except Exception as e:
+                print(f"Error reloading configuration: {e}")
+            finally:
+                db.close()
+    
+    def _needs_full_reload(self, full: bool, aggregate) -> bool:
+        row_count, id_checksum, _ = aggregate
+        return (
+            full
+            or self._watermark is None
+            or (row_count, id_checksum) != (self._row_count, self._id_checksum)
+            or time.time() - self._last_full_reload > self._full_reload_interval
+        )
+    
+    def _has_changes(self, aggregate) -> bool:
+        last_updated = aggregate[2]
+        return last_updated is not None and last_updated > self._watermark
+    
+    def _rows_query(self, full: bool):
+        if full:
+            return select(SystemConfig)
+        # >= re-reads rows sharing the watermark timestamp, which may have
+        # been committed after the previous reload read it
+        return select(SystemConfig).where(SystemConfig.updated_at >= self._watermark)
+    
+    def _mark_checked(self, version: Optional[int]):
+        """Nothing changed: keep the values, just record the check"""
+        self._snapshot = ConfigSnapshot(self._snapshot.values, time.time(), self._snapshot.typed)
+        self._version = version
+    
+    def _apply_reload(self, configs: List[SystemConfig], full: bool, aggregate, version: Optional[int]):
+        """Decode the loaded rows, publish the snapshot and advance the watermark"""
+        if full:
             new_cache = {}
+            candidates = None
+        else:
+            new_cache = dict(self._snapshot.values)
+            candidates = {config.config_key for config in configs}
+        
+        for config in configs:
+            value = config.config_value
             
-            for config in configs:
-                value = config.config_value
-                
-                # Decrypt if encrypted
-                if config.is_encrypted and value:
-                    try:
-                        value = encryption_util.decrypt(value)
-                    except Exception as e:
-                        print(f"Failed to decrypt config {config.config_key}: {e}")
-                        continue
-                
-                # Try to parse as JSON
+            # Decrypt if encrypted
+            if config.is_encrypted and value:
                 try:
-                    value = json.loads(value)
-                except (json.JSONDecodeError, TypeError):
-                    # Keep as string if not valid JSON
-                    pass
-                
-                new_cache[config.config_key] = value
+                    value = encryption_util.decrypt(value)
+                except Exception as e:
+                    print(f"Failed to decrypt config {config.config_key}: {e}")
+                    new_cache.pop(config.config_key, None)
+                    continue
             
-            self._config_cache = new_cache
-            self._last_reload = time.time()
+            # Try to parse as JSON
+            try:
+                value = json.loads(value)
+            except (json.JSONDecodeError, TypeError):
+                # Keep as string if not valid JSON
+                pass
             
-        except Exception as e:
-            print(f"Error reloading configuration: {e}")
-        finally:
-            db.close()
+            new_cache[config.config_key] = value
+        
+        self._publish(new_cache, candidates)
+        
+        self._row_count, self._id_checksum, self._watermark = aggregate
+        self._version = version
+        if full:
+            self._last_full_reload = time.time()
     
-    def get_config(self, key: str, default: Any = None) -> Any:
-        """Get a configuration value by key"""
-        # Reload if cache is empty or if it's been too long
-        if not self._config_cache or (time.time() - self._last_reload) > self._reload_interval:
-            self.reload_config()
+    def _publish(self, values: Dict[str, Any], candidates: Optional[Iterable[str]] = None):
+        """
+        Swap in a new snapshot and notify listeners of the keys that changed.
+        
+        candidates limits the comparison to the keys a delta reload touched.
+        """
+        previous_snapshot = self._snapshot
+        previous = previous_snapshot.values
+        if candidates is not None:
+            candidates = set(candidates)
+        typed, errors = config_registry.convert(values, previous_snapshot.typed, candidates)
+        for key, error in errors.items():
+            print(f"Invalid value for config {key}, keeping the previous one: {error}")
+        
+        if candidates is None:
+            candidates = previous.keys() | values.keys()
+        changed = frozenset(
+            key for key in candidates
+            if key not in previous or key not in values or previous[key] != values[key]
+        )
         
-        return self._config_cache.get(key, default)
+        # A single reference assignment: readers see the old or the new snapshot, never a mix
+        snapshot = ConfigSnapshot(MappingProxyType(values), time.time(), typed)
+        self._snapshot = snapshot
+        
+        if not changed:
+            return
+        for listener in self._listeners:
+            try:
+                listener(changed, snapshot)
+            except Exception as e:
+                print(f"Error in config listener: {e}")
+    
+    def _request_reload(self):
+        """Make a local write visible: wake the reloader, or reload here when it is not running"""
+        if self._running:
+            # Writes come from request threads; the event belongs to the reloader's loop
+            self._loop.call_soon_threadsafe(self._wake.set)
+        else:
+            self.reload_config()
+    
+    def get_config(self, key: str, default: Any = None) -> Any:
+        """Get a configuration value by key from the current snapshot (never touches the DB)"""
+        return self._snapshot.get(key, default)
     
     def set_config(self, key: str, value: Any, description: str = None, encrypt: bool = False) -> bool:
         """Set a configuration value"""
@@ -126,10 +326,10 @@ class ConfigService:
             if description:
                 config.description = description
             
+            self._bump_version(db)
             db.commit()
             
-            # Update cache immediately
-            self._config_cache[key] = value
+            self._request_reload()
             
             return True
             
@@ -147,10 +347,10 @@ class ConfigService:
             config = db.query(SystemConfig).filter(SystemConfig.config_key == key).first()
             if config:
                 db.delete(config)
+                self._bump_version(db)
                 db.commit()
                 
-                # Remove from cache
-                self._config_cache.pop(key, None)
+                self._request_reload()
                 return True
             return False
             
@@ -163,17 +363,11 @@ class ConfigService:
     
     def get_all_configs(self) -> Dict[str, Any]:
         """Get all configuration values"""
-        if not self._config_cache or (time.time() - self._last_reload) > self._reload_interval:
-            self.reload_config()
-        
-        return self._config_cache.copy()
+        return dict(self._snapshot.values)
     
     def is_hot_reload_enabled(self) -> bool:
         """Check if hot reload is enabled"""
-        value = self.get_config("hot_reload_enabled", "true")
-        if isinstance(value, bool):
-            return value
-        return str(value).lower() == "true"
+        return self._snapshot.typed.hot_reload_enabled
 
 # Global instance
 config_service = ConfigService()
\ No newline at end of file
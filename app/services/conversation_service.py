@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from app.models.conversation import Conversation, ConversationMessage
+from app.core.config import settings
+from app.utils.tokens import estimate_tokens
+from app.utils.persistence import save
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain the running summary of a conversation between a user and an assistant. "
+    "Merge the existing summary and the new turns into one concise summary that keeps "
+    "facts, decisions, open questions and user preferences. Reply with the summary only."
+)
+
+class ConversationService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_conversation(self, agent_id: int, user_id: int) -> Conversation:
+        """Start a new server-side conversation with an agent"""
+        conversation = Conversation(agent_id=agent_id, user_id=user_id)
+
+        save(self.db, conversation)
+
+        return conversation
+
+    def get_conversation(self, conversation_id: int, user_id: int, agent_id: int) -> Conversation:
+        """Get a conversation owned by the user for the given agent"""
+        conversation = self.db.query(Conversation).filter(
+            Conversation.id == conversation_id,
+            Conversation.user_id == user_id
+        ).first()
+
+        if not conversation or conversation.agent_id != agent_id:
+            raise ValueError(f"Conversation with id {conversation_id} not found for this agent")
+
+        return conversation
+
+    def build_history_messages(self, conversation: Conversation) -> List[BaseMessage]:
+        """
+        Messages carrying the conversation so far: the summary of compacted
+        turns followed by the most recent turns that fit the token budget.
+        """
+        messages = []
+
+        if conversation.summary:
+            messages.append(SystemMessage(content=f"Conversation summary: {conversation.summary}"))
+
+        for message in self._recent_messages(conversation):
+            if message.role == "user":
+                messages.append(HumanMessage(content=message.content))
+            else:
+                messages.append(AIMessage(content=message.content))
+
+        return messages
+
+    def append_turn(
+        self,
+        conversation: Conversation,
+        execution_id: int,
+        user_content: str,
+        assistant_content: str
+    ):
+        """Store a user/assistant turn (committed by the caller)"""
+        for role, content in (("user", user_content), ("assistant", assistant_content)):
+            self.db.add(ConversationMessage(
+                conversation_id=conversation.id,
+                execution_id=execution_id,
+                role=role,
+                content=content,
+                token_count=estimate_tokens(content)
+            ))
+        conversation.updated_at = datetime.utcnow()
+        self.db.flush()
+
+    def summary_prompt(
+        self, conversation: Conversation
+    ) -> Optional[Tuple[List[BaseMessage], List[ConversationMessage]]]:
+        """
+        Prompt folding the oldest turns into the summary once the unsummarized
+        history exceeds the token budget, leaving at most half the budget
+        verbatim so the summarization cost is amortized over several turns.
+
+        Returns:
+            Tuple of (prompt, messages to fold), or None if nothing needs compacting
+        """
+        budget = settings.conversation_history_token_budget
+        pending = self._unsummarized_query(conversation).order_by(ConversationMessage.id).all()
+
+        remaining = sum(message.token_count or 0 for message in pending)
+        if remaining <= budget:
+            return None
+
+        to_fold = []
+        for message in pending:
+            if remaining <= budget // 2:
+                break
+            to_fold.append(message)
+            remaining -= message.token_count or 0
+
+        transcript = "\n".join(f"{message.role}: {message.content}" for message in to_fold)
+        prompt = [
+            SystemMessage(content=SUMMARY_INSTRUCTIONS),
+            HumanMessage(
+                content=f"Existing summary:\n{conversation.summary or '(none)'}\n\nNew turns:\n{transcript}"
+            )
+        ]
+        return prompt, to_fold
+
+    def apply_summary(self, conversation: Conversation, folded: List[ConversationMessage], summary: str):
+        """Replace the summary and mark the folded turns (committed by the caller)"""
+        conversation.summary = summary
+        conversation.summary_tokens = estimate_tokens(summary)
+        conversation.updated_at = datetime.utcnow()
+        for message in folded:
+            message.is_summarized = True
+
+    def _recent_messages(self, conversation: Conversation) -> List[ConversationMessage]:
+        """Newest unsummarized turns within the token budget, oldest first"""
+        budget = settings.conversation_history_token_budget
+        recent = []
+        used = 0
+
+        newest_first = self._unsummarized_query(conversation).order_by(ConversationMessage.id.desc())
+        for message in newest_first:
+            used += message.token_count or 0
+            if used > budget:
+                break
+            recent.append(message)
+
+        recent.reverse()
+        return recent
+
+    def _unsummarized_query(self, conversation: Conversation):
+        return self.db.query(ConversationMessage).filter(
+            ConversationMessage.conversation_id == conversation.id,
+            ConversationMessage.is_summarized == False
+        )
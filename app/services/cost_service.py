@@ -1,7 +1,9 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from app.models.cost import Cost
+from app.utils.bulk_insert import bulk_insert
+from app.utils.persistence import save
 from decimal import Decimal
 
 class CostService:
@@ -18,6 +20,7 @@ class CostService:
         execution_id: Optional[int] = None,
         tokens_input: int = 0,
         tokens_output: int = 0,
+        tokens_cached: int = 0,
         description: Optional[str] = None,
         currency: str = "USD"
     ) -> Cost:
@@ -33,15 +36,55 @@ class CostService:
             currency=currency,
             tokens_input=tokens_input,
             tokens_output=tokens_output,
+            tokens_cached=tokens_cached,
             description=description
         )
         
-        self.db.add(cost)
-        self.db.commit()
-        self.db.refresh(cost)
+        save(self.db, cost)
         
         return cost
     
+    def cost_row(
+        self,
+        user_id: int,
+        cost_type: str,
+        amount: Decimal,
+        agent_id: Optional[int] = None,
+        tool_id: Optional[int] = None,
+        execution_id: Optional[int] = None,
+        tokens_input: int = 0,
+        tokens_output: int = 0,
+        tokens_cached: int = 0,
+        description: Optional[str] = None,
+        currency: str = "USD"
+    ) -> Dict[str, Any]:
+        """Column values of a cost entry for record_costs (every row has the same keys)"""
+        return {
+            "user_id": user_id,
+            "agent_id": agent_id,
+            "tool_id": tool_id,
+            "execution_id": execution_id,
+            "cost_type": cost_type,
+            "amount": amount,
+            "currency": currency,
+            "tokens_input": tokens_input,
+            "tokens_output": tokens_output,
+            "tokens_cached": tokens_cached,
+            "description": description
+        }
+    
+    def record_costs(self, rows: List[Dict[str, Any]], commit: bool = True) -> List[int]:
+        """
+        Record many cost entries (built with cost_row) in one batched insert.
+        
+        Returns:
+            Ids of the new entries, in the order of rows
+        """
+        ids = bulk_insert(self.db, Cost, rows)
+        if commit:
+            self.db.commit()
+        return ids
+    
     def get_user_costs(
         self, 
         user_id: int, 
@@ -51,22 +94,48 @@ class CostService:
     ) -> dict:
         """Get cost summary for a user"""
         
-        query = self.db.query(Cost).filter(Cost.user_id == user_id)
+        query = self._user_costs_query(user_id, cost_type, start_date, end_date)
+        costs = self.db.execute(query).scalars().all()
+        return self._summarize_costs(costs)
+    
+    async def aget_user_costs(
+        self, 
+        user_id: int, 
+        cost_type: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> dict:
+        """get_user_costs for a service built on an AsyncSession"""
+        
+        query = self._user_costs_query(user_id, cost_type, start_date, end_date)
+        costs = (await self.db.execute(query)).scalars().all()
+        return self._summarize_costs(costs)
+    
+    def _user_costs_query(
+        self,
+        user_id: int,
+        cost_type: Optional[str],
+        start_date: Optional[str],
+        end_date: Optional[str]
+    ):
+        query = select(Cost).where(Cost.user_id == user_id)
         
         if cost_type:
-            query = query.filter(Cost.cost_type == cost_type)
+            query = query.where(Cost.cost_type == cost_type)
         
         if start_date:
-            query = query.filter(Cost.created_at >= start_date)
+            query = query.where(Cost.created_at >= start_date)
         
         if end_date:
-            query = query.filter(Cost.created_at <= end_date)
-        
-        costs = query.all()
+            query = query.where(Cost.created_at <= end_date)
         
+        return query
+    
+    def _summarize_costs(self, costs: List[Cost]) -> dict:
         total_amount = sum(cost.amount for cost in costs)
         total_tokens_input = sum(cost.tokens_input for cost in costs)
         total_tokens_output = sum(cost.tokens_output for cost in costs)
+        total_tokens_cached = sum(cost.tokens_cached or 0 for cost in costs)
         
         # Group by cost type
         by_type = {}
@@ -76,18 +145,21 @@ class CostService:
                     "count": 0,
                     "total_amount": Decimal("0"),
                     "total_tokens_input": 0,
-                    "total_tokens_output": 0
+                    "total_tokens_output": 0,
+                    "total_tokens_cached": 0
                 }
             
             by_type[cost.cost_type]["count"] += 1
             by_type[cost.cost_type]["total_amount"] += cost.amount
             by_type[cost.cost_type]["total_tokens_input"] += cost.tokens_input
             by_type[cost.cost_type]["total_tokens_output"] += cost.tokens_output
+            by_type[cost.cost_type]["total_tokens_cached"] += cost.tokens_cached or 0
         
         return {
             "total_amount": total_amount,
             "total_tokens_input": total_tokens_input,
             "total_tokens_output": total_tokens_output,
+            "total_tokens_cached": total_tokens_cached,
             "total_entries": len(costs),
             "by_type": by_type
         }
@@ -0,0 +1,161 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import openai
+from langchain_openai import ChatOpenAI
+from langchain.schema import BaseMessage
+from app.models.agent import Agent
+from app.core.config import settings
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model_name: str
+    timeout_ms: Optional[int] = None  # Latency budget before falling back to the next model
+    max_cost: Optional[float] = None  # Skip this model when the request could cost more
+
+@dataclass
+class HedgeOutcome:
+    delay_ms: int
+    fired: bool = False
+    winner: str = "primary"  # primary or hedge
+    # Responses of requests that lost the race (None when cancelled in flight;
+    # failed requests are left out since the provider does not bill them)
+    losers: List[Optional[BaseMessage]] = field(default_factory=list)
+
+@dataclass
+class RoutedResponse:
+    response: BaseMessage
+    route: ModelRoute
+    fallbacks: List[Dict[str, str]] = field(default_factory=list)
+    hedge: Optional[HedgeOutcome] = None
+
+class ModelRoutingError(ValueError):
+    """No configured model could serve the request"""
+
+def get_model_routes(agent: Agent) -> List[ModelRoute]:
+    """Ordered models of an agent; agents without routes use model_name alone"""
+    routes = json.loads(agent.model_routes or "[]")
+    if not routes:
+        return [ModelRoute(agent.model_name)]
+    return [
+        ModelRoute(route["model_name"], route.get("timeout_ms"), route.get("max_cost"))
+        for route in routes
+    ]
+
+def is_fallback_error(error: Exception) -> bool:
+    """Errors where another model may still succeed: timeouts, rate limits, provider outages"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, TimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+class ModelRouter:
+    """
+    Calls an agent's models in order, moving to the next one when a model
+    times out, is rate limited or unavailable.
+    
+    Every model but the last runs without client retries, so a slow or
+    throttled model costs at most its timeout before the next one is tried.
+    """
+    
+    def __init__(self, estimate_cost: Callable[[str, int], float]):
+        self.estimate_cost = estimate_cost
+    
+    def build_llm(self, agent: Agent, route: ModelRoute, max_retries: Optional[int] = None) -> ChatOpenAI:
+        options: Dict[str, Any] = {}
+        if route.timeout_ms:
+            options["request_timeout"] = route.timeout_ms / 1000
+        if max_retries is not None:
+            options["max_retries"] = max_retries
+        
+        return ChatOpenAI(
+            model_name=route.model_name,
+            temperature=float(agent.temperature),
+            max_tokens=agent.max_tokens,
+            top_p=float(agent.top_p),
+            frequency_penalty=float(agent.frequency_penalty),
+            presence_penalty=float(agent.presence_penalty),
+            openai_api_key=settings.openai_api_key,
+            **options
+        )
+    
+    def eligible_routes(self, agent: Agent, prompt_tokens: int) -> List[ModelRoute]:
+        """Routes whose worst-case cost (full prompt plus max_tokens) fits their budget"""
+        worst_case_tokens = prompt_tokens + (agent.max_tokens or 0)
+        return [
+            route for route in get_model_routes(agent)
+            if route.max_cost is None or self.estimate_cost(route.model_name, worst_case_tokens) <= route.max_cost
+        ]
+    
+    def invoke(
+        self,
+        agent: Agent,
+        messages: List[BaseMessage],
+        prompt_tokens: int,
+        hedge_after_ms: Optional[int] = None
+    ) -> RoutedResponse:
+        """
+        Call the routes in order. With hedge_after_ms, each model call that has
+        not answered after that long gets a duplicate request, and the first
+        answer wins.
+        """
+        routes = self.eligible_routes(agent, prompt_tokens)
+        if not routes:
+            raise ModelRoutingError(f"No model of agent {agent.name} fits its cost budget for this request")
+        
+        fallbacks = []
+        for index, route in enumerate(routes):
+            is_last = index == len(routes) - 1
+            llm = self.build_llm(agent, route, max_retries=None if is_last else 0)
+            try:
+                if hedge_after_ms is None:
+                    return RoutedResponse(llm(messages), route, fallbacks)
+                hedge = HedgeOutcome(delay_ms=hedge_after_ms)
+                response = asyncio.run(self._hedged_call(llm, messages, hedge))
+                return RoutedResponse(response, route, fallbacks, hedge)
+            except Exception as e:
+                if is_last or not is_fallback_error(e):
+                    raise
+                fallbacks.append({"model_name": route.model_name, "error": type(e).__name__})
+    
+    async def _hedged_call(self, llm: ChatOpenAI, messages: List[BaseMessage], hedge: HedgeOutcome) -> BaseMessage:
+        """
+        Race the request against a duplicate sent after hedge.delay_ms.
+        
+        The first successful answer wins and the other request is cancelled,
+        closing its connection. A failed request leaves the race to the other
+        one; if both fail, the primary's error is raised.
+        """
+        primary = asyncio.ensure_future(llm.ainvoke(messages))
+        done, _ = await asyncio.wait({primary}, timeout=hedge.delay_ms / 1000)
+        if done:
+            return primary.result()
+        
+        hedge.fired = True
+        secondary = asyncio.ensure_future(llm.ainvoke(messages))
+        pending = {primary, secondary}
+        winner = None
+        
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if winner is None and task.exception() is None:
+                        winner = task
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        if winner is None:
+            raise primary.exception()
+        
+        hedge.winner = "primary" if winner is primary else "hedge"
+        loser = secondary if winner is primary else primary
+        if loser.cancelled():
+            hedge.losers.append(None)
+        elif loser.exception() is None:
+            hedge.losers.append(loser.result())
+        
+        return winner.result()
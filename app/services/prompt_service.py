@@ -1,9 +1,16 @@
-import re
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.models.prompt_template import PromptTemplate
+from app.core.config import settings
+from app.utils.persistence import save
+from app.utils.template_compiler import (
+    CachedTemplate,
+    PromptTemplateCache,
+    analyze_template,
+    compile_template
+)
 
 class PromptService:
     def __init__(self, db: Session):
@@ -12,78 +19,138 @@ class PromptService:
     def render_template(self, template_id: int, variables: Dict[str, Any]) -> str:
         """Render a prompt template with provided variables"""
         
+        template = self.get_cached_template(template_id)
+        if not template or not template.is_active:
+            raise ValueError(f"Template with id {template_id} not found or inactive")
+        
+        return self._render(template, variables)
+    
+    def render_latest_template(self, name: str, variables: Dict[str, Any]) -> str:
+        """Render the latest active version of a template by name"""
+        
+        template = self.get_latest_template(name)
+        if not template:
+            raise ValueError(f"No active template named {name}")
+        
+        return self._render(template, variables)
+    
+    def get_cached_template(self, template_id: int) -> Optional[CachedTemplate]:
+        """Get a compiled template by id, loading it from the database on a cache miss"""
+        
+        cached = prompt_template_cache.get(template_id)
+        if cached:
+            return cached
+        
+        template = self.db.query(PromptTemplate).filter(PromptTemplate.id == template_id).first()
+        if not template:
+            return None
+        
+        cached = self._build_cached_template(template)
+        prompt_template_cache.put(cached)
+        return cached
+    
+    def get_latest_template(self, name: str) -> Optional[CachedTemplate]:
+        """Get the compiled latest active version of a template by name"""
+        
+        cached = prompt_template_cache.get_latest(name)
+        if cached:
+            return cached
+        
         template = self.db.query(PromptTemplate).filter(
-            PromptTemplate.id == template_id,
+            PromptTemplate.name == name,
             PromptTemplate.is_active == True
-        ).first()
-        
+        ).order_by(PromptTemplate.version.desc()).first()
         if not template:
-            raise ValueError(f"Template with id {template_id} not found or inactive")
+            return None
         
-        # Get template variables
-        template_variables = []
+        cached = self._build_cached_template(template)
+        prompt_template_cache.put(cached, latest=True)
+        return cached
+    
+    def invalidate_template(self, template: PromptTemplate, previous_name: Optional[str] = None):
+        """Drop cached entries affected by a change to a template"""
+        prompt_template_cache.invalidate(template.id)
+        prompt_template_cache.invalidate_name(template.name)
+        if previous_name and previous_name != template.name:
+            prompt_template_cache.invalidate_name(previous_name)
+    
+    def _build_cached_template(self, template: PromptTemplate) -> CachedTemplate:
+        # Parse the variables JSON once per load instead of once per render
+        required_variables = []
         if template.variables:
             try:
-                template_variables = json.loads(template.variables)
+                required_variables = json.loads(template.variables)
             except json.JSONDecodeError:
                 pass
         
+        return CachedTemplate(
+            id=template.id,
+            name=template.name,
+            version=template.version,
+            is_active=bool(template.is_active),
+            created_by=template.created_by,
+            required_variables=tuple(required_variables),
+            compiled=compile_template(template.template_content)
+        )
+    
+    def validate_batch(
+        self,
+        template: CachedTemplate,
+        variables_list: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Check every variable set of a batch, returning one error per invalid set"""
+        errors = []
+        for index, variables in enumerate(variables_list):
+            missing_vars = self._missing_variables(template, variables)
+            if missing_vars:
+                errors.append({
+                    "index": index,
+                    "error": f"Missing required variables: {', '.join(missing_vars)}"
+                })
+        return errors
+    
+    def render_batch(
+        self,
+        template: CachedTemplate,
+        variables_list: List[Dict[str, Any]]
+    ) -> Iterator[str]:
+        """Render a validated batch lazily, one compiled render per variable set"""
+        render = template.compiled.render
+        for variables in variables_list:
+            yield render(variables)
+    
+    def _missing_variables(self, template: CachedTemplate, variables: Dict[str, Any]) -> List[str]:
+        return [var for var in template.required_variables if var not in variables]
+    
+    def _render(self, template: CachedTemplate, variables: Dict[str, Any]) -> str:
         # Validate that all required variables are provided
-        missing_vars = []
-        for var in template_variables:
-            if var not in variables:
-                missing_vars.append(var)
+        missing_vars = self._missing_variables(template, variables)
         
         if missing_vars:
             raise ValueError(f"Missing required variables: {', '.join(missing_vars)}")
         
-        # Render template
-        content = template.template_content
-        
-        # Replace variables in format {variable_name}
-        for var_name, var_value in variables.items():
-            pattern = f"{{{var_name}}}"
-            content = content.replace(pattern, str(var_value))
-        
-        return content
+        # Render template in a single pass over its compiled segments
+        return template.compiled.render(variables)
     
     def extract_variables_from_template(self, template_content: str) -> List[str]:
         """Extract variable names from a template content"""
-        
-        # Find all {variable_name} patterns
-        pattern = r'\{([^}]+)\}'
-        matches = re.findall(pattern, template_content)
-        
-        # Remove duplicates and return
-        return list(set(matches))
+        return analyze_template(template_content).variables
     
     def validate_template(self, template_content: str) -> Dict[str, Any]:
         """Validate a template and return analysis"""
         
-        variables = self.extract_variables_from_template(template_content)
-        
-        # Check for common issues
-        issues = []
-        
-        # Check for unclosed braces
-        open_braces = template_content.count('{')
-        close_braces = template_content.count('}')
-        if open_braces != close_braces:
-            issues.append("Mismatched braces - check for unclosed variable declarations")
-        
-        # Check for empty variables
-        if '{}' in template_content:
-            issues.append("Empty variable declarations found")
-        
-        # Check for nested braces
-        if '{{' in template_content or '}}' in template_content:
-            issues.append("Nested braces detected - use single braces for variables")
+        # Single tokenizer pass, shared with the renderer
+        analysis = analyze_template(template_content)
         
         return {
-            "is_valid": len(issues) == 0,
-            "variables": variables,
-            "variable_count": len(variables),
-            "issues": issues
+            "is_valid": len(analysis.issues) == 0,
+            "variables": analysis.variables,
+            "variable_count": len(analysis.variables),
+            "escape_count": analysis.escape_count,
+            "issues": [f"{issue.message} at offset {issue.offset}" for issue in analysis.issues],
+            "issue_details": [
+                {"message": issue.message, "offset": issue.offset} for issue in analysis.issues
+            ]
         }
     
     def create_template_version(
@@ -119,8 +186,12 @@ class PromptService:
             created_by=original.created_by
         )
         
-        self.db.add(new_template)
-        self.db.commit()
-        self.db.refresh(new_template)
+        save(self.db, new_template)
         
-        return new_template
\ No newline at end of file
+        # The new version becomes the latest for this name
+        self.invalidate_template(new_template)
+        
+        return new_template
+
+# Global instance
+prompt_template_cache = PromptTemplateCache(ttl_seconds=settings.prompt_cache_ttl_seconds)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.core.database import AsyncReadSessionLocal, AsyncSessionLocal, replica_lag
+from app.models.replica_heartbeat import ReplicaHeartbeat
+
+class ReplicaMonitor:
+    """
+    Measures read replica lag with a heartbeat: every check writes the
+    current UTC time to replica_heartbeat on the primary and reads the row
+    back from the replica. The age of the replicated value is the lag,
+    overestimated by at most the interval between heartbeats from all workers.
+    """
+
+    def __init__(self, interval: float = settings.read_replica_check_interval):
+        self._interval = interval
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return AsyncReadSessionLocal is not None
+
+    def start(self):
+        """Start the monitor as an asyncio task when a read replica is configured"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._monitor_loop())
+            print("Read replica monitor started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            print("Read replica monitor stopped")
+
+    async def _monitor_loop(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self._interval)
+
+    async def check(self):
+        """Write a heartbeat on the primary and record how old the replica's copy is"""
+        try:
+            await self._beat()
+            async with AsyncReadSessionLocal() as db:
+                beat_at = (await db.execute(
+                    select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)
+                )).scalar()
+            if beat_at is None:
+                replica_lag.record_failure("No heartbeat on the replica yet")
+                return
+            replica_lag.record((datetime.utcnow() - beat_at).total_seconds())
+        except SQLAlchemyError as e:
+            replica_lag.record_failure(str(e))
+            print(f"Error checking read replica lag: {e}")
+
+    async def _beat(self):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(ReplicaHeartbeat)
+                .where(ReplicaHeartbeat.id == 1)
+                .values(beat_at=datetime.utcnow())
+            )
+            if result.rowcount == 0:
+                db.add(ReplicaHeartbeat(id=1, beat_at=datetime.utcnow()))
+            await db.commit()
+
+# Global instance
+replica_monitor = ReplicaMonitor()
@@ -1,14 +1,62 @@
-import json
+import random
+import asyncio
 import httpx
-from typing import Dict, Any, Optional
+from decimal import Decimal
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.models.tool import Tool
 from app.models.encrypted_credentials import EncryptedCredentials
+from app.core.config import settings
+from app.services.cost_service import CostService
+from app.utils.circuit_breaker import CircuitBreaker, tool_circuit_breakers
+from app.utils import fast_json
 from app.utils.encryption import encryption_util
+from app.utils.persistence import save
+from app.utils.http_cache import (
+    CachedResponse,
+    build_cache_key,
+    parse_cache_control,
+    tool_response_cache
+)
+from app.utils.single_flight import tool_request_flight
+
+# Methods that can be safely sent again after a failure
+SAFE_METHODS = {"GET"}
+# Idempotent by HTTP semantics, retried only for tools that vouch for their endpoint
+IDEMPOTENT_WRITE_METHODS = {"PUT", "DELETE"}
+
+# Transient failures worth retrying
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+RETRYABLE_EXCEPTIONS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.ReadError,
+    httpx.RemoteProtocolError
+)
+
+@dataclass
+class ToolResponse:
+    status_code: int
+    headers: httpx.Headers
+    data: Any
+    size: int  # Bytes of body read
+    truncated: bool = False
+
+# Hooks called as hook(tool, tool_response) -> data on every parsed response
+_response_hooks: List[Callable[[Tool, ToolResponse], Any]] = []
+
+def register_response_hook(hook: Callable[[Tool, ToolResponse], Any]):
+    """Register a hook that can truncate or summarize tool responses"""
+    _response_hooks.append(hook)
 
 class ToolService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.db = db
+        self.cost_service = CostService(db)
+        self.transport = transport  # None sends real requests
+        # Cost rows of every call, inserted together by flush_costs
+        self.pending_costs: List[Dict[str, Any]] = []
     
     async def execute_tool(
         self, 
@@ -18,7 +66,8 @@ class ToolService:
         method: str = "GET",
         headers: Optional[Dict[str, str]] = None,
         body: Optional[Dict[str, Any]] = None,
-        auth_config: Optional[str] = None
+        auth_config: Optional[str] = None,
+        record_costs: bool = True
     ) -> Dict[str, Any]:
         """
         Execute an HTTP tool call
@@ -31,11 +80,39 @@ class ToolService:
             headers: Additional headers to include
             body: Request body for POST/PUT requests
             auth_config: Name of encrypted credentials to use for auth
+            record_costs: Insert and commit the call's cost row before
+                returning. Callers making several calls in one transaction
+                pass False and call flush_costs once.
             
         Returns:
-            Dict containing status_code, data, execution_time, and cost
+            Dict containing status_code, data, execution_time, and cost.
+            Responses of cache-enabled tools also include cache_status
+            ("hit", "revalidated" or "miss"); cache hits cost nothing.
+            GET calls that joined an identical in-flight request are flagged
+            with coalesced=True and also cost nothing. When the tool's
+            circuit is open the call fails fast with a 503 and circuit_open=True.
+            Bodies larger than the tool's max_response_bytes are cut at the
+            cap and flagged with truncated=True. Every call, including cache
+            hits and coalesced calls, gets a cost row.
         """
-        
+        try:
+            return await self._execute_tool(
+                tool_id, user_id, endpoint, method, headers, body, auth_config
+            )
+        finally:
+            if record_costs:
+                self.flush_costs(commit=True)
+    
+    async def _execute_tool(
+        self,
+        tool_id: int,
+        user_id: int,
+        endpoint: str,
+        method: str,
+        headers: Optional[Dict[str, str]],
+        body: Optional[Dict[str, Any]],
+        auth_config: Optional[str]
+    ) -> Dict[str, Any]:
         tool = self.db.query(Tool).filter(Tool.id == tool_id).first()
         if not tool:
             raise ValueError(f"Tool with id {tool_id} not found")
@@ -52,9 +129,9 @@ class ToolService:
         request_headers = {}
         if tool.default_headers:
             try:
-                default_headers = json.loads(tool.default_headers)
+                default_headers = fast_json.loads(tool.default_headers)
                 request_headers.update(default_headers)
-            except json.JSONDecodeError:
+            except ValueError:
                 pass
         
         if headers:
@@ -77,39 +154,101 @@ class ToolService:
                     encoded = base64.b64encode(credentials.encode()).decode()
                     request_headers["Authorization"] = f"Basic {encoded}"
         
+        # Serve cacheable GET requests from the response cache when possible
+        cache_key = None
+        cached = None
+        if tool.cache_enabled and method.upper() == "GET":
+            cache_key = build_cache_key(tool.id, method, endpoint, request_headers)
+            cached = tool_response_cache.get(cache_key)
+            if cached and cached.is_fresh():
+                return self._cache_hit_result(tool, user_id, cached, "hit", 0.0)
+            if cached and cached.etag:
+                request_headers["If-None-Match"] = cached.etag
+        
+        # Fail fast while the upstream is known to be down
+        breaker = self._get_circuit_breaker(tool)
+        if breaker and not breaker.allow_request():
+            return {
+                "status_code": 503,
+                "data": {"error": f"Circuit open for tool {tool.name}"},
+                "execution_time": 0.0,
+                "cost": 0.0,
+                "circuit_open": True
+            }
+        
         # Execute HTTP request
         import time
         start_time = time.time()
         
         try:
-            async with httpx.AsyncClient(timeout=tool.timeout_seconds) as client:
-                if method.upper() == "GET":
-                    response = await client.get(endpoint, headers=request_headers)
-                elif method.upper() == "POST":
-                    response = await client.post(endpoint, headers=request_headers, json=body)
-                elif method.upper() == "PUT":
-                    response = await client.put(endpoint, headers=request_headers, json=body)
-                elif method.upper() == "DELETE":
-                    response = await client.delete(endpoint, headers=request_headers)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-                
-                execution_time = time.time() - start_time
-                
-                # Parse response
-                try:
-                    response_data = response.json()
-                except:
-                    response_data = response.text
-                
-                return {
-                    "status_code": response.status_code,
-                    "data": response_data,
-                    "execution_time": execution_time,
-                    "cost": float(tool.cost_per_request)
-                }
-                
+            if method.upper() == "GET":
+                # Identical concurrent GET calls share a single upstream request
+                flight_key = build_cache_key(tool.id, method, endpoint, request_headers)
+                (response, attempts), coalesced = await tool_request_flight.do(
+                    flight_key,
+                    lambda: self._send_with_retries(
+                        tool, breaker, method, endpoint, request_headers, body
+                    )
+                )
+            else:
+                response, attempts = await self._send_with_retries(
+                    tool, breaker, method, endpoint, request_headers, body
+                )
+                coalesced = False
+            
+            execution_time = time.time() - start_time
+            
+            # Upstream confirmed our cached copy is still valid
+            if cached and response.status_code == 304:
+                ttl = self._cache_ttl(tool, response)
+                tool_response_cache.refresh(cache_key, ttl if ttl is not None else 0)
+                return self._cache_hit_result(
+                    tool, user_id, cached, "revalidated", execution_time
+                )
+            
+            # Only the caller that made the request populates the cache
+            if (cache_key and not coalesced and not response.truncated
+                    and response.status_code == 200):
+                ttl = self._cache_ttl(tool, response)
+                if ttl is not None:
+                    tool_response_cache.put(
+                        cache_key,
+                        CachedResponse(
+                            tool_id=tool.id,
+                            status_code=response.status_code,
+                            data=response.data,
+                            size=response.size,
+                            expires_at=time.time() + ttl,
+                            etag=response.headers.get("ETag")
+                        ),
+                        tool_max_bytes=tool.cache_max_bytes or 0
+                    )
+            
+            result = {
+                "status_code": response.status_code,
+                "data": response.data,
+                "execution_time": execution_time,
+                "cost": float(tool.cost_per_request) * attempts
+            }
+            if response.truncated:
+                result["truncated"] = True
+            if attempts > 1:
+                result["attempts"] = attempts
+            if cache_key:
+                result["cache_status"] = "miss"
+            if coalesced:
+                self._queue_cost(tool, user_id, Decimal("0"), f"Coalesced call for tool {tool.name}")
+                result["cost"] = 0.0
+                result["coalesced"] = True
+            else:
+                self._queue_cost(
+                    tool, user_id, (tool.cost_per_request or Decimal("0")) * attempts,
+                    f"Call to tool {tool.name}"
+                )
+            return result
+            
         except httpx.TimeoutException:
+            self._queue_cost(tool, user_id, tool.cost_per_request or Decimal("0"), f"Timed out call to tool {tool.name}")
             return {
                 "status_code": 408,
                 "data": {"error": "Request timeout"},
@@ -117,6 +256,7 @@ class ToolService:
                 "cost": float(tool.cost_per_request)
             }
         except Exception as e:
+            self._queue_cost(tool, user_id, tool.cost_per_request or Decimal("0"), f"Failed call to tool {tool.name}")
             return {
                 "status_code": 500,
                 "data": {"error": str(e)},
@@ -124,6 +264,209 @@ class ToolService:
                 "cost": float(tool.cost_per_request)
             }
     
+    def _get_circuit_breaker(self, tool: Tool) -> Optional[CircuitBreaker]:
+        """Get the circuit breaker of a tool, or None if disabled"""
+        threshold = float(tool.circuit_error_threshold or 0)
+        if threshold <= 0:
+            return None
+        
+        return tool_circuit_breakers.get(
+            tool.id,
+            error_threshold=threshold,
+            min_requests=tool.circuit_min_requests or 1,
+            open_seconds=tool.circuit_open_seconds or 0
+        )
+    
+    async def _send_with_retries(
+        self,
+        tool: Tool,
+        breaker: Optional[CircuitBreaker],
+        method: str,
+        endpoint: str,
+        headers: Dict[str, str],
+        body: Optional[Dict[str, Any]]
+    ) -> Tuple[ToolResponse, int]:
+        """
+        Send the request, retrying transient failures of GET (and of PUT and
+        DELETE when the tool sets idempotent_writes) with jittered
+        exponential backoff. Every attempt is reported to the circuit breaker.
+        
+        Returns:
+            Tuple of (response, number of attempts)
+        """
+        max_retries = 0
+        if (method.upper() in SAFE_METHODS
+                or (method.upper() in IDEMPOTENT_WRITE_METHODS and tool.idempotent_writes)):
+            max_retries = max(tool.retry_max_attempts or 0, 0)
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self._send_request(
+                    tool, method, endpoint, headers, body
+                )
+            except httpx.HTTPError as e:
+                if breaker:
+                    breaker.record_failure()
+                if (attempt > max_retries
+                        or not isinstance(e, RETRYABLE_EXCEPTIONS)
+                        or (breaker and breaker.is_open())):
+                    raise
+                delay = self._retry_delay(tool, attempt, None)
+            else:
+                if breaker:
+                    if response.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if (attempt > max_retries
+                        or response.status_code not in RETRYABLE_STATUS_CODES
+                        or (breaker and breaker.is_open())):
+                    return response, attempt
+                delay = self._retry_delay(tool, attempt, response)
+            
+            await asyncio.sleep(delay)
+    
+    def _retry_delay(self, tool: Tool, attempt: int, response: Optional[ToolResponse]) -> float:
+        """Seconds to wait before the next attempt (full jitter, honors Retry-After)"""
+        max_backoff = settings.tool_retry_max_backoff_ms / 1000
+        
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), max_backoff)
+        
+        base = (tool.retry_backoff_ms or 0) / 1000
+        return random.uniform(0, min(base * (2 ** (attempt - 1)), max_backoff))
+    
+    async def _send_request(
+        self,
+        tool: Tool,
+        method: str,
+        endpoint: str,
+        headers: Dict[str, str],
+        body: Optional[Dict[str, Any]]
+    ) -> ToolResponse:
+        """
+        Send the HTTP request and stream its body up to the tool's size cap.
+        
+        The body is read once into a single buffer and decoded once, so the
+        memory held per call is bounded by the cap. Oversized bodies are cut
+        at the cap and returned as text with truncated=True.
+        """
+        if method.upper() not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        max_bytes = tool.max_response_bytes or settings.tool_max_response_bytes
+        
+        content = None
+        if method.upper() in ("POST", "PUT") and body is not None:
+            content = fast_json.dumps_bytes(body)
+            if not any(name.lower() == "content-type" for name in headers):
+                headers = {**headers, "Content-Type": "application/json"}
+        
+        buffer = bytearray()
+        truncated = False
+        async with httpx.AsyncClient(timeout=tool.timeout_seconds, transport=self.transport) as client:
+            async with client.stream(method.upper(), endpoint, headers=headers, content=content) as response:
+                async for chunk in response.aiter_bytes():
+                    remaining = max_bytes - len(buffer)
+                    if len(chunk) > remaining:
+                        buffer.extend(chunk[:remaining])
+                        truncated = True
+                        break
+                    buffer.extend(chunk)
+                encoding = response.charset_encoding or "utf-8"
+        
+        # Parse response (a truncated body can't be valid JSON, keep it as text)
+        parsed = False
+        if not truncated:
+            try:
+                response_data = fast_json.loads(buffer)
+                parsed = True
+            except (ValueError, UnicodeDecodeError):
+                pass
+        if not parsed:
+            response_data = buffer.decode(encoding, errors="replace")
+        
+        tool_response = ToolResponse(
+            status_code=response.status_code,
+            headers=response.headers,
+            data=response_data,
+            size=len(buffer),
+            truncated=truncated
+        )
+        
+        # Let registered hooks shrink or summarize the payload before it reaches the LLM
+        for hook in _response_hooks:
+            tool_response.data = hook(tool, tool_response)
+        
+        return tool_response
+    
+    def _cache_ttl(self, tool: Tool, response: ToolResponse) -> Optional[int]:
+        """
+        Compute how long a response may be served from cache.
+        
+        Returns None when the response must not be stored. A TTL of 0 keeps the
+        entry only for conditional revalidation with its ETag.
+        """
+        directives = parse_cache_control(response.headers.get("Cache-Control"))
+        if "no-store" in directives:
+            return None
+        
+        ttl = tool.cache_ttl_seconds or 0
+        if "no-cache" in directives:
+            ttl = 0
+        elif "max-age" in directives:
+            try:
+                ttl = min(ttl, max(int(directives["max-age"]), 0))
+            except (TypeError, ValueError):
+                pass
+        
+        if ttl <= 0 and not response.headers.get("ETag"):
+            return None
+        return ttl
+    
+    def _cache_hit_result(
+        self,
+        tool: Tool,
+        user_id: int,
+        cached: CachedResponse,
+        cache_status: str,
+        execution_time: float
+    ) -> Dict[str, Any]:
+        """Build the result for a response served from cache and record it as zero cost"""
+        self._queue_cost(tool, user_id, Decimal("0"), f"Cache {cache_status} for tool {tool.name}")
+        
+        return {
+            "status_code": cached.status_code,
+            "data": cached.data,
+            "execution_time": execution_time,
+            "cost": 0.0,
+            "cache_status": cache_status
+        }
+    
+    def _queue_cost(self, tool: Tool, user_id: int, amount: Decimal, description: str):
+        """Queue the cost row of a tool call for flush_costs"""
+        self.pending_costs.append(self.cost_service.cost_row(
+            user_id=user_id,
+            tool_id=tool.id,
+            cost_type="tool_call",
+            amount=amount,
+            description=description
+        ))
+    
+    def flush_costs(self, commit: bool = False) -> List[int]:
+        """
+        Insert the queued cost rows in one batch, inside the caller's
+        transaction unless commit is set.
+        """
+        rows, self.pending_costs = self.pending_costs, []
+        if not rows:
+            return []
+        return self.cost_service.record_costs(rows, commit=commit)
+    
     def _get_decrypted_credentials(self, user_id: int, credential_name: str) -> Optional[Dict[str, Any]]:
         """Get and decrypt stored credentials for a user"""
         credential = self.db.query(EncryptedCredentials).filter(
@@ -136,7 +479,7 @@ class ToolService:
         
         try:
             decrypted_data = encryption_util.decrypt(credential.encrypted_data)
-            return json.loads(decrypted_data)
+            return fast_json.loads(decrypted_data)
         except Exception:
             return None
     
@@ -159,7 +502,7 @@ class ToolService:
             self.db.delete(existing)
         
         # Encrypt and store new credential
-        encrypted_data = encryption_util.encrypt(json.dumps(credential_data))
+        encrypted_data = encryption_util.encrypt(fast_json.dumps(credential_data))
         
         credential = EncryptedCredentials(
             user_id=user_id,
@@ -168,8 +511,6 @@ class ToolService:
             credential_type=credential_type
         )
         
-        self.db.add(credential)
-        self.db.commit()
-        self.db.refresh(credential)
+        save(self.db, credential)
         
         return credential
\ No newline at end of file
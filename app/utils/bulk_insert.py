@@ -0,0 +1,33 @@
+from typing import Any, Dict, List, Sequence
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+def bulk_insert(
+    db: Session,
+    model: Any,
+    rows: Sequence[Dict[str, Any]],
+    return_ids: bool = True
+) -> List[int]:
+    """
+    Insert many rows of a model's table in one executemany, without
+    committing and without building ORM objects.
+    
+    All rows must have the same keys. With return_ids, SQLAlchemy batches
+    them into multi-row INSERT ... OUTPUT inserted.id (SQL Server) or
+    RETURNING (SQLite) statements and the ids come back in the order of
+    rows. Without it, pyodbc's fast_executemany sends every parameter set
+    in a single round trip.
+    
+    Returns:
+        The new primary keys, or an empty list when return_ids is False
+    """
+    if not rows:
+        return []
+    
+    table = model.__table__
+    if not return_ids:
+        db.execute(insert(table), list(rows))
+        return []
+    
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    return list(db.execute(statement, list(rows)).scalars())
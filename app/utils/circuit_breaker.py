@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker.
+
+    Closed: requests flow and outcomes are tracked over a rolling window.
+    Open: requests are rejected until open_seconds have passed.
+    Half-open: a single probe request is let through; its outcome closes or
+    re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        error_threshold: float = 0.5,
+        min_requests: int = 10,
+        open_seconds: float = 30,
+        window_seconds: float = 60,
+        clock: Callable[[], float] = time.time
+    ):
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self._outcomes = deque()  # (timestamp, succeeded)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now"""
+        with self._lock:
+            now = self._clock()
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_started_at = None
+
+            # Half-open: allow one probe; a probe that never reported back is replaced
+            if self._probe_started_at is None or now - self._probe_started_at >= self.open_seconds:
+                self._probe_started_at = now
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._state == self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._close()
+                return
+            self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._record(False)
+
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            total = len(self._outcomes)
+            if total >= self.min_requests and failures / total >= self.error_threshold:
+                self._open()
+
+    def _record(self, succeeded: bool):
+        now = self._clock()
+        self._outcomes.append((now, succeeded))
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._probe_started_at = None
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._probe_started_at = None
+        self._outcomes.clear()
+
+class CircuitBreakerRegistry:
+    """Circuit breakers keyed by tool id, kept in sync with the tool settings"""
+
+    def __init__(self):
+        self._breakers: Dict[int, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        tool_id: int,
+        error_threshold: float,
+        min_requests: int,
+        open_seconds: float
+    ) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(tool_id)
+            if breaker is None:
+                breaker = CircuitBreaker(error_threshold, min_requests, open_seconds)
+                self._breakers[tool_id] = breaker
+            else:
+                breaker.error_threshold = error_threshold
+                breaker.min_requests = min_requests
+                breaker.open_seconds = open_seconds
+            return breaker
+
+    def reset(self, tool_id: int):
+        with self._lock:
+            self._breakers.pop(tool_id, None)
+
+    def states(self) -> Dict[int, str]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {tool_id: breaker.state for tool_id, breaker in breakers.items()}
+
+# Global instance
+tool_circuit_breakers = CircuitBreakerRegistry()
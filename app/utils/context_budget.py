@@ -0,0 +1,99 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+# Context window per model; unknown models use the configured default
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-16k": 16385
+}
+
+# Per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_STRATEGIES = ("head", "tail", "middle", "reject")
+
+class ContextBudgetExceeded(ValueError):
+    """The prompt cannot be made to fit the model window"""
+
+@dataclass
+class BudgetResult:
+    input_message: str
+    context: Dict[str, Any]
+    prompt_tokens: int
+    dropped_context_keys: List[str] = field(default_factory=list)
+    input_truncated: bool = False
+
+def serialize_context(context: Dict[str, Any]) -> str:
+    """Deterministic compact JSON, so the same context always yields the same prompt bytes"""
+    return json.dumps(context, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def message_tokens(content: str, model_name: Optional[str] = None) -> int:
+    return count_tokens(content, model_name) + MESSAGE_OVERHEAD_TOKENS
+
+def context_tokens(context: Dict[str, Any], model_name: Optional[str] = None) -> int:
+    if not context:
+        return 0
+    return message_tokens(f"Context: {serialize_context(context)}", model_name)
+
+def fit_context_budget(
+    input_message: str,
+    context: Optional[Dict[str, Any]],
+    available_tokens: int,
+    strategy: str = "tail",
+    key_priority: Optional[List[str]] = None,
+    model_name: Optional[str] = None
+) -> BudgetResult:
+    """
+    Make the context and user input fit in available_tokens.
+    
+    Context keys are dropped first, least important first: keys missing from
+    key_priority, then the priority list from its end. If the input alone is
+    still too long it is truncated with the given strategy ("head", "tail" or
+    "middle"), or rejected with strategy "reject".
+    
+    Raises:
+        ContextBudgetExceeded: if the request cannot fit
+    """
+    context = dict(context or {})
+    key_priority = key_priority or []
+    input_tokens = message_tokens(input_message, model_name)
+    used_by_context = context_tokens(context, model_name)
+    
+    result = BudgetResult(input_message, context, input_tokens + used_by_context)
+    if result.prompt_tokens <= available_tokens:
+        return result
+    
+    ranked = set(key_priority)
+    drop_order = [key for key in sorted(context) if key not in ranked]
+    drop_order += [key for key in reversed(key_priority) if key in context]
+    
+    for key in drop_order:
+        if input_tokens + used_by_context <= available_tokens:
+            break
+        del context[key]
+        result.dropped_context_keys.append(key)
+        used_by_context = context_tokens(context, model_name)
+    
+    if input_tokens + used_by_context > available_tokens:
+        room = available_tokens - used_by_context - MESSAGE_OVERHEAD_TOKENS
+        error = ContextBudgetExceeded(
+            f"Input needs {input_tokens} tokens but only {max(room, 0)} are available in the context window"
+        )
+        # Re-count the truncated input and truncate again if it still overflows
+        while input_tokens + used_by_context > available_tokens:
+            if strategy == "reject" or room <= 0:
+                raise error
+            result.input_message = truncate_to_tokens(input_message, room, strategy, model_name)
+            result.input_truncated = True
+            input_tokens = message_tokens(result.input_message, model_name)
+            room -= input_tokens + used_by_context - available_tokens
+    
+    result.prompt_tokens = input_tokens + used_by_context
+    return result
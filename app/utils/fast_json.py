@@ -0,0 +1,69 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """Serialize types that neither backend handles natively"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class StdlibJSONBackend:
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def loads(self, data: Union[str, bytes, bytearray]) -> Any:
+        return json.loads(data)
+
+class OrjsonBackend:
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: Union[str, bytes, bytearray]) -> Any:
+        return orjson.loads(data)
+
+_backends = {"json": StdlibJSONBackend}
+if orjson is not None:
+    _backends["orjson"] = OrjsonBackend
+
+_backend = OrjsonBackend() if orjson is not None else StdlibJSONBackend()
+
+def set_backend(name: str):
+    """Select the JSON backend ("auto", "orjson" or "json")"""
+    global _backend
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in _backends:
+        raise ValueError(f"JSON backend '{name}' is not available")
+    _backend = _backends[name]()
+
+def backend_name() -> str:
+    return _backend.name
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    return _backend.dumps(obj)
+
+def dumps(obj: Any) -> str:
+    """Serialize to a compact JSON string"""
+    return _backend.dumps(obj).decode("utf-8")
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Parse JSON; raises ValueError on invalid input with either backend"""
+    return _backend.loads(data)
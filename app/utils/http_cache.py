@@ -0,0 +1,129 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+from app.core.config import settings
+
+def parse_cache_control(header_value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a dict of directives"""
+    directives = {}
+    if not header_value:
+        return directives
+
+    for part in header_value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            name, value = part.split("=", 1)
+            directives[name.strip().lower()] = value.strip().strip('"')
+        else:
+            directives[part.lower()] = None
+
+    return directives
+
+def build_cache_key(tool_id: int, method: str, endpoint: str, headers: Dict[str, str]) -> str:
+    """Build a cache key for a request; headers are hashed so credentials never collide across users"""
+    normalized_headers = sorted((k.lower(), str(v)) for k, v in headers.items())
+    raw = json.dumps([tool_id, method.upper(), endpoint, normalized_headers], separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+@dataclass
+class CachedResponse:
+    tool_id: int
+    status_code: int
+    data: Any
+    size: int
+    expires_at: float
+    etag: Optional[str] = None
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+class ResponseCache:
+    """Thread-safe LRU cache for tool responses with global and per-tool byte caps"""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._total_bytes = 0
+        self._tool_bytes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get an entry (fresh or stale) and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedResponse, tool_max_bytes: int) -> bool:
+        """Store an entry, evicting least recently used entries to respect the caps"""
+        if entry.size > tool_max_bytes or entry.size > self._max_bytes:
+            return False
+
+        with self._lock:
+            self._remove(key)
+
+            # Evict oldest entries of the same tool until it fits its own budget
+            if self._tool_bytes.get(entry.tool_id, 0) + entry.size > tool_max_bytes:
+                for old_key in [k for k, e in self._entries.items() if e.tool_id == entry.tool_id]:
+                    self._remove(old_key)
+                    if self._tool_bytes.get(entry.tool_id, 0) + entry.size <= tool_max_bytes:
+                        break
+
+            # Evict globally until the whole cache fits
+            while self._entries and self._total_bytes + entry.size > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            self._tool_bytes[entry.tool_id] = self._tool_bytes.get(entry.tool_id, 0) + entry.size
+            return True
+
+    def refresh(self, key: str, ttl_seconds: float) -> Optional[CachedResponse]:
+        """Extend the lifetime of an entry after a successful revalidation (304)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.time() + ttl_seconds
+                self._entries.move_to_end(key)
+            return entry
+
+    def invalidate_tool(self, tool_id: int):
+        """Drop every cached response of a tool"""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.tool_id == tool_id]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tool_bytes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self._max_bytes
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size
+        remaining = self._tool_bytes.get(entry.tool_id, 0) - entry.size
+        if remaining > 0:
+            self._tool_bytes[entry.tool_id] = remaining
+        else:
+            self._tool_bytes.pop(entry.tool_id, None)
+
+# Global instance
+tool_response_cache = ResponseCache(max_bytes=settings.tool_cache_max_bytes)
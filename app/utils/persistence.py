@@ -0,0 +1,52 @@
+from typing import Any
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+def save(db: Session, *instances: Any) -> None:
+    """
+    Add instances and commit without a refresh round trip for them.
+
+    On models mapped with eager_defaults, the flush gets generated ids and
+    server defaults (created_at, updated_at) from the INSERT/UPDATE ...
+    OUTPUT (SQL Server) / RETURNING (SQLite) statement itself. The commit
+    expires the session as usual; only the column values of the saved
+    instances are put back as committed state afterwards, so they can still
+    be read once the session is closed. Columns a new instance never set
+    and that have no server default were inserted as NULL. Relationships
+    and every other object reload on next access.
+    """
+    inserted = set()
+    for instance in instances:
+        state = inspect(instance)
+        if state.transient or state.pending:
+            inserted.add(id(instance))
+        if instance not in db:
+            db.add(instance)
+    db.flush()
+
+    loaded = []
+    for instance in instances:
+        state = inspect(instance)
+        values = {}
+        for attr in state.mapper.column_attrs:
+            if attr.key in state.dict:
+                values[attr.key] = state.dict[attr.key]
+            elif id(instance) in inserted and all(
+                column.server_default is None for column in attr.columns
+            ):
+                values[attr.key] = None
+        loaded.append((instance, values))
+
+    db.commit()
+
+    for instance, values in loaded:
+        for key, value in values.items():
+            set_committed_value(instance, key, value)
+
+async def asave(db: AsyncSession, *instances: Any) -> None:
+    """save for an AsyncSession; AsyncSessionLocal never expires on commit"""
+    for instance in instances:
+        db.add(instance)
+    await db.commit()
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Type
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+class PoolStats:
+    """Checkout waits, checkouts and connection hold times of one engine's pool"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.waits = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_held_ms = 0.0
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            if timed_out:
+                self.timeouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self._recent.append(wait_ms)
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_checkin(self, held_ms: float):
+        with self._lock:
+            self.checkins += 1
+            self.total_held_ms += held_ms
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": self.total_wait_ms / self.waits if self.waits else 0.0,
+                "max_wait_ms": self.max_wait_ms,
+                "p95_wait_ms": recent[max(int(len(recent) * 0.95) - 1, 0)] if recent else 0.0,
+                "avg_held_ms": self.total_held_ms / self.checkins if self.checkins else 0.0
+            }
+
+def instrumented_pool_class(base: Type[Pool], stats: PoolStats) -> Type[Pool]:
+    """
+    Subclass of a pool that times its public connect(), including calls
+    that time out. No pool event fires before a checkout starts waiting,
+    so this is the only place the wait can be measured.
+    """
+
+    class InstrumentedPool(base):
+        def connect(self):
+            start = time.perf_counter()
+            timed_out = False
+            try:
+                return super().connect()
+            except PoolTimeoutError:
+                timed_out = True
+                raise
+            finally:
+                stats.record_wait((time.perf_counter() - start) * 1000, timed_out)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+def track_pool_events(engine, stats: PoolStats):
+    """Count checkouts, checkins and new connections with the pool events of a (sync) engine"""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.record_connect()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        stats.record_checkout()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            stats.record_checkin((time.perf_counter() - checked_out_at) * 1000)
+
+def pool_status(pool: Pool, stats: Optional[PoolStats] = None, max_overflow: Optional[int] = None) -> Dict[str, Any]:
+    """Occupancy of a pool through its public accessors, plus its event statistics"""
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    # Only queue pools report sizes
+    if hasattr(pool, "checkedout"):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0)
+        })
+        if max_overflow is not None:
+            status["max_overflow"] = max_overflow
+
+    if stats is not None:
+        status["stats"] = stats.snapshot()
+
+    return status
@@ -0,0 +1,54 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class ReplicaLag:
+    """
+    Last measured replication lag of a read replica.
+    
+    A measurement ages with time: a replica that was lag_seconds behind
+    when checked may have fallen behind by the time elapsed since, so the
+    staleness bound applies to lag_seconds plus the age of the check.
+    With no measurement, or after a failed check, the replica is not used.
+    """
+    
+    def __init__(self, max_lag_seconds: float):
+        self.max_lag_seconds = max_lag_seconds
+        self._lock = threading.Lock()
+        self._lag_seconds: Optional[float] = None
+        self._checked_at = 0.0
+        self._error: Optional[str] = None
+    
+    def record(self, lag_seconds: float, now: Optional[float] = None):
+        with self._lock:
+            self._lag_seconds = max(lag_seconds, 0.0)
+            self._checked_at = time.monotonic() if now is None else now
+            self._error = None
+    
+    def record_failure(self, error: str):
+        with self._lock:
+            self._lag_seconds = None
+            self._error = error
+    
+    def staleness(self, now: Optional[float] = None) -> Optional[float]:
+        """Upper bound of how far the replica may be behind, None when unknown"""
+        with self._lock:
+            if self._lag_seconds is None:
+                return None
+            now = time.monotonic() if now is None else now
+            return self._lag_seconds + max(now - self._checked_at, 0.0)
+    
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        staleness = self.staleness(now)
+        return staleness is not None and staleness <= self.max_lag_seconds
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lag_seconds, error = self._lag_seconds, self._error
+        return {
+            "lag_seconds": lag_seconds,
+            "staleness_seconds": self.staleness(),
+            "max_lag_seconds": self.max_lag_seconds,
+            "fresh": self.is_fresh(),
+            "error": error
+        }
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+class SingleFlight:
+    """
+    Deduplicate identical in-flight async calls.
+
+    The first caller for a key starts the call as its own task; callers
+    arriving while it is still running wait for and share its result (or
+    exception). Cancelling any caller, the first one included, only stops
+    that caller's wait, never the shared call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key at a time.
+
+        Returns:
+            Tuple of (result, shared) where shared is True when the result
+            came from a call started by another caller
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+
+        task = self._calls.get(call_key)
+        if task is not None:
+            return await asyncio.shield(task), True
+
+        task = loop.create_task(fn())
+        self._calls[call_key] = task
+        task.add_done_callback(lambda done: self._finish(call_key, done))
+        return await asyncio.shield(task), False
+
+    def _finish(self, call_key: Tuple[int, str], task: asyncio.Task):
+        if self._calls.get(call_key) is task:
+            del self._calls[call_key]
+        # Mark as retrieved so a failure nobody waited for is not logged by asyncio
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+# Global instance
+tool_request_flight = SingleFlight()
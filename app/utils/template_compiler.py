@@ -0,0 +1,176 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+class CompiledTemplate:
+    """
+    A prompt template parsed once into literal and placeholder segments.
+
+    Rendering is a single join over the segments, so substituted values are
+    never scanned again (a value containing "{other}" stays literal).
+    """
+
+    __slots__ = ("segments", "variables")
+
+    def __init__(self, segments: Tuple[Tuple[bool, str], ...]):
+        # (is_placeholder, text): text is the literal or the variable name
+        self.segments = segments
+        self.variables = list(dict.fromkeys(text for is_var, text in segments if is_var))
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        parts = []
+        append = parts.append
+        for is_var, text in self.segments:
+            if not is_var:
+                append(text)
+            elif text in variables:
+                append(str(variables[text]))
+            else:
+                # Unknown placeholders are left untouched
+                append("{" + text + "}")
+        return "".join(parts)
+
+# One alternation scanned left to right: escapes first, then placeholders,
+# then any brace left over (which is an error)
+_TOKEN_PATTERN = re.compile(r"\{\{|\}\}|\{([^{}]*)\}|[{}]")
+
+@dataclass(frozen=True)
+class TemplateIssue:
+    message: str
+    offset: int
+
+@dataclass(frozen=True)
+class TemplateAnalysis:
+    segments: Tuple[Tuple[bool, str], ...]
+    variables: List[str]
+    escape_count: int
+    issues: List[TemplateIssue]
+
+def analyze_template(content: str) -> TemplateAnalysis:
+    """
+    Tokenize a template in a single linear pass.
+
+    {name} is a placeholder, {{ and }} are escaped literal braces. Any other
+    brace, and empty placeholders, are reported as issues with their offset
+    and kept as literal text.
+    """
+    segments: List[Tuple[bool, str]] = []
+    literal: List[str] = []
+    issues: List[TemplateIssue] = []
+    escape_count = 0
+    position = 0
+
+    for match in _TOKEN_PATTERN.finditer(content):
+        start = match.start()
+        if start > position:
+            literal.append(content[position:start])
+        position = match.end()
+
+        token = match.group(0)
+        if token == "{{" or token == "}}":
+            literal.append(token[0])
+            escape_count += 1
+        elif token == "{":
+            literal.append(token)
+            issues.append(TemplateIssue("Unclosed '{'", start))
+        elif token == "}":
+            literal.append(token)
+            issues.append(TemplateIssue("Unmatched '}'", start))
+        elif not match.group(1).strip():
+            literal.append(token)
+            issues.append(TemplateIssue("Empty variable declaration", start))
+        else:
+            if literal:
+                segments.append((False, "".join(literal)))
+                literal = []
+            segments.append((True, match.group(1)))
+
+    if position < len(content):
+        literal.append(content[position:])
+    if literal:
+        segments.append((False, "".join(literal)))
+
+    variables = list(dict.fromkeys(text for is_var, text in segments if is_var))
+    return TemplateAnalysis(tuple(segments), variables, escape_count, issues)
+
+def compile_template(content: str) -> CompiledTemplate:
+    """Parse {variable_name} placeholders in a single pass"""
+    return CompiledTemplate(analyze_template(content).segments)
+
+@dataclass(frozen=True)
+class CachedTemplate:
+    """Everything needed to authorize and render a template without the DB"""
+    id: int
+    name: str
+    version: int
+    is_active: bool
+    created_by: Optional[int]
+    required_variables: Tuple[str, ...]
+    compiled: CompiledTemplate
+    loaded_at: float = field(default_factory=time.time)
+
+class PromptTemplateCache:
+    """
+    Thread-safe cache of compiled templates, by id and by name for the latest
+    active version.
+
+    Local writes invalidate entries immediately; the TTL bounds how long an
+    edit made by another worker can go unnoticed.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._by_id: "OrderedDict[int, CachedTemplate]" = OrderedDict()
+        self._latest_by_name: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, template_id: int) -> Optional[CachedTemplate]:
+        with self._lock:
+            entry = self._by_id.get(template_id)
+            if entry is None:
+                return None
+            if time.time() - entry.loaded_at > self._ttl_seconds:
+                self._remove(template_id)
+                return None
+            self._by_id.move_to_end(template_id)
+            return entry
+
+    def get_latest(self, name: str) -> Optional[CachedTemplate]:
+        with self._lock:
+            template_id = self._latest_by_name.get(name)
+        if template_id is None:
+            return None
+        return self.get(template_id)
+
+    def put(self, entry: CachedTemplate, latest: bool = False):
+        """Store an entry; latest=True also makes it the active version for its name"""
+        with self._lock:
+            self._by_id[entry.id] = entry
+            self._by_id.move_to_end(entry.id)
+            if latest:
+                self._latest_by_name[entry.name] = entry.id
+            while len(self._by_id) > self._max_entries:
+                self._remove(next(iter(self._by_id)))
+
+    def invalidate(self, template_id: int):
+        with self._lock:
+            self._remove(template_id)
+
+    def invalidate_name(self, name: str):
+        """Forget which version is the latest for a name (e.g. after a new version)"""
+        with self._lock:
+            self._latest_by_name.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._latest_by_name.clear()
+
+    def _remove(self, template_id: int):
+        entry = self._by_id.pop(template_id, None)
+        if entry is not None and self._latest_by_name.get(entry.name) == template_id:
+            del self._latest_by_name[entry.name]
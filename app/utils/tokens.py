@@ -0,0 +1,126 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 1.3 tokens per word) - in production, use tiktoken"""
+    if not text:
+        return 0
+    return int(len(text.split()) * 1.3)
+
+@lru_cache(maxsize=32)
+def _get_encoding(model_name: Optional[str]):
+    """
+    tiktoken encoding for a model, or None to use the estimator.
+    
+    Encodings download their BPE file on first use; when that fails (e.g. no
+    network) the failure is cached so later calls don't retry it.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name or "")
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"tiktoken encoding unavailable, estimating tokens instead: {e}")
+        return None
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """Count tokens with tiktoken when installed, otherwise estimate them"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+def truncate_to_tokens(
+    text: str,
+    max_tokens: int,
+    strategy: str = "tail",
+    model_name: Optional[str] = None,
+    marker: str = "\n...\n"
+) -> str:
+    """
+    Shorten text to at most max_tokens.
+    
+    Strategies: "head" keeps the beginning, "tail" keeps the end and "middle"
+    keeps both ends, dropping the middle. The marker replacing the middle
+    counts toward max_tokens; when it doesn't fit, the beginning is kept.
+    """
+    if max_tokens <= 0:
+        return ""
+    
+    encoding = _get_encoding(model_name)
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        if strategy == "tail":
+            return encoding.decode(tokens[-max_tokens:])
+        if strategy == "middle":
+            # Tokens can merge across the joins, so check the result and shrink until it fits
+            budget = max_tokens - len(encoding.encode(marker, disallowed_special=()))
+            while budget > 0:
+                tail = budget // 2
+                truncated = (encoding.decode(tokens[:budget - tail]) + marker
+                             + encoding.decode(tokens[len(tokens) - tail:]))
+                overflow = len(encoding.encode(truncated, disallowed_special=())) - max_tokens
+                if overflow <= 0:
+                    return truncated
+                budget -= overflow
+        return encoding.decode(tokens[:max_tokens])
+    
+    # Without a tokenizer, cut characters in proportion to the estimate
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return text
+    if strategy == "tail":
+        return text[len(text) - int(len(text) * max_tokens / total):]
+    if strategy == "middle":
+        budget = max_tokens - estimate_tokens(marker)
+        while budget > 0:
+            keep = int(len(text) * budget / total)
+            tail = keep // 2
+            truncated = text[:keep - tail] + marker + text[len(text) - tail:]
+            overflow = estimate_tokens(truncated) - max_tokens
+            if overflow <= 0:
+                return truncated
+            budget -= overflow
+    return text[:int(len(text) * max_tokens / total)]
+
+def get_token_usage(messages: List[Any], response: Any) -> Dict[str, int]:
+    """
+    Read input/output/cached token counts reported by the provider for a chat
+    response, falling back to estimates when the response carries no usage.
+    """
+    usage_metadata = getattr(response, "usage_metadata", None) or {}
+    if usage_metadata:
+        details = usage_metadata.get("input_token_details") or {}
+        return {
+            "input": int(usage_metadata.get("input_tokens") or 0),
+            "output": int(usage_metadata.get("output_tokens") or 0),
+            "cached": int(details.get("cache_read") or 0)
+        }
+    
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        return {
+            "input": int(token_usage.get("prompt_tokens") or 0),
+            "output": int(token_usage.get("completion_tokens") or 0),
+            "cached": int(details.get("cached_tokens") or 0)
+        }
+    
+    prompt_text = "\n".join(message.content for message in messages)
+    return {
+        "input": estimate_tokens(prompt_text),
+        "output": estimate_tokens(response.content),
+        "cached": 0
+    }
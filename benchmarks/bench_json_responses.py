@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON rendering of /metrics/executions listings
+
+Compares the stdlib encoder used by FastAPI's default JSONResponse with the
+fast JSON layer (orjson when installed) on payloads shaped like the
+encoded Execution schema.
+
+Usage:
+    python -m benchmarks.bench_json_responses
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+from app.utils import fast_json
+
+def build_executions(count: int) -> list:
+    """Build a listing as FastAPI hands it to the response class"""
+    started = datetime(2024, 1, 1)
+    executions = []
+    for i in range(count):
+        executions.append({
+            "id": i + 1,
+            "agent_id": (i % 25) + 1,
+            "user_id": (i % 7) + 1,
+            "input_data": f"Summarize the quarterly report number {i} for the finance team",
+            "output_data": "The report shows revenue growth of 12% with stable operating costs. " * 4,
+            "status": "completed" if i % 10 else "failed",
+            "execution_time_ms": 850 + (i % 300),
+            "tokens_used": 420 + (i % 90),
+            "cost": 0.00084 + (i % 5) * 0.0001,
+            "error_message": None if i % 10 else "Rate limit exceeded",
+            "metadata": {"model_name": "gpt-3.5-turbo"},
+            "started_at": (started + timedelta(seconds=i)).isoformat(),
+            "completed_at": (started + timedelta(seconds=i + 1)).isoformat()
+        })
+    return executions
+
+def render_stdlib(content) -> bytes:
+    # Same settings as starlette.responses.JSONResponse.render
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def bench(render, content, iterations: int) -> float:
+    """Return renders per second"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render(content)
+    return iterations / (time.perf_counter() - start)
+
+def main():
+    fast_json.set_backend("auto")
+    print(f"Fast JSON backend: {fast_json.backend_name()}")
+    print(f"{'rows':>6} {'stdlib (req/s)':>16} {'fast (req/s)':>16} {'speedup':>8}")
+
+    for rows, iterations in ((10, 5000), (100, 1000), (1000, 100)):
+        content = build_executions(rows)
+        assert json.loads(render_stdlib(content)) == json.loads(fast_json.dumps_bytes(content))
+
+        stdlib_rate = bench(render_stdlib, content, iterations)
+        fast_rate = bench(fast_json.dumps_bytes, content, iterations)
+        print(f"{rows:>6} {stdlib_rate:>16.0f} {fast_rate:>16.0f} {fast_rate / stdlib_rate:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark prompt template rendering
+
+Compares the previous renderer (one str.replace per provided variable) with
+the compiled single-pass renderer, for large templates and many variables.
+
+Usage:
+    python -m benchmarks.bench_prompt_render
+"""
+
+import time
+
+from app.utils.template_compiler import compile_template
+
+def render_replace(content: str, variables: dict) -> str:
+    # Previous PromptService.render_template implementation
+    for var_name, var_value in variables.items():
+        pattern = f"{{{var_name}}}"
+        content = content.replace(pattern, str(var_value))
+    return content
+
+def build_template(variable_count: int, repeats: int) -> tuple:
+    variables = {f"var_{i}": f"value number {i}" for i in range(variable_count)}
+    paragraph = " ".join(
+        f"Section {i} refers to {{var_{i}}} and keeps going with plain text." for i in range(variable_count)
+    )
+    return "\n".join([paragraph] * repeats), variables
+
+def bench(fn, iterations: int) -> float:
+    """Return average milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+def main():
+    print(f"{'vars':>6} {'size (KB)':>10} {'replace (ms)':>13} {'compile (ms)':>13} {'render (ms)':>12} {'speedup':>8}")
+
+    for variable_count, repeats, iterations in ((10, 10, 2000), (100, 10, 200), (500, 20, 20), (2000, 5, 5)):
+        content, variables = build_template(variable_count, repeats)
+        compiled = compile_template(content)
+        assert compiled.render(variables) == render_replace(content, variables)
+
+        replace_ms = bench(lambda: render_replace(content, variables), iterations)
+        compile_ms = bench(lambda: compile_template(content), iterations)
+        render_ms = bench(lambda: compiled.render(variables), iterations)
+        print(
+            f"{variable_count:>6} {len(content) / 1024:>10.1f} {replace_ms:>13.3f} "
+            f"{compile_ms:>13.3f} {render_ms:>12.3f} {replace_ms / render_ms:>7.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -61,6 +61,20 @@ CREATE TABLE system_config (
 );
 GO
 
+-- Config version counter (single row, bumped on every config write)
+CREATE TABLE system_config_version (
+    id INT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+GO
+
+-- Replica heartbeat (single row, written on the primary, read back from the read replica)
+CREATE TABLE replica_heartbeat (
+    id INT PRIMARY KEY,
+    beat_at DATETIME2 NOT NULL DEFAULT GETUTCDATE()
+);
+GO
+
 -- Encrypted credentials table
 CREATE TABLE encrypted_credentials (
     id INT IDENTITY(1,1) PRIMARY KEY,
@@ -99,6 +113,16 @@ CREATE TABLE tools (
     requires_auth BIT DEFAULT 0,
     cost_per_request DECIMAL(10,6) DEFAULT 0.0,
     timeout_seconds INT DEFAULT 30,
+    max_response_bytes INT, -- NULL uses the global default
+    cache_enabled BIT DEFAULT 0, -- Cache GET responses
+    cache_ttl_seconds INT DEFAULT 300,
+    cache_max_bytes INT DEFAULT 1048576,
+    retry_max_attempts INT DEFAULT 0, -- Retries for GET (and PUT/DELETE when idempotent_writes), 0 disables
+    retry_backoff_ms INT DEFAULT 200,
+    idempotent_writes BIT DEFAULT 0, -- PUT/DELETE on this endpoint are safe to repeat
+    circuit_error_threshold DECIMAL(3,2) DEFAULT 0, -- Error rate that opens the circuit, 0 disables
+    circuit_min_requests INT DEFAULT 10,
+    circuit_open_seconds INT DEFAULT 30,
     is_active BIT DEFAULT 1,
     created_by INT FOREIGN KEY REFERENCES users(id),
     created_at DATETIME2 DEFAULT GETUTCDATE(),
@@ -113,13 +137,20 @@ CREATE TABLE agents (
     description NVARCHAR(500),
     system_prompt NVARCHAR(MAX),
     personality NVARCHAR(MAX),
+    prompt_template_id INT FOREIGN KEY REFERENCES prompt_templates(id), -- Replaces system_prompt when set
+    prompt_template_variables NVARCHAR(MAX), -- JSON with the fixed template variables
     model_name NVARCHAR(50) DEFAULT 'gpt-3.5-turbo',
+    model_routes NVARCHAR(MAX), -- JSON list of {model_name, timeout_ms, max_cost}, tried in order
     temperature DECIMAL(3,2) DEFAULT 0.7,
     max_tokens INT DEFAULT 1000,
+    context_window_tokens INT, -- NULL uses the model's known window
+    truncation_strategy NVARCHAR(20) DEFAULT 'tail', -- head, tail, middle or reject
+    context_key_priority NVARCHAR(MAX), -- JSON list of context keys, most important first
     top_p DECIMAL(3,2) DEFAULT 1.0,
     frequency_penalty DECIMAL(3,2) DEFAULT 0.0,
     presence_penalty DECIMAL(3,2) DEFAULT 0.0,
     rate_limit_per_minute INT DEFAULT 10,
+    hedging_enabled BIT DEFAULT 0, -- Duplicate LLM calls slower than the agent's p95
     is_active BIT DEFAULT 1,
     created_by INT FOREIGN KEY REFERENCES users(id),
     created_at DATETIME2 DEFAULT GETUTCDATE(),
@@ -139,13 +170,27 @@ CREATE TABLE agent_tools (
 );
 GO
 
+-- Conversations table (server-side chat history)
+CREATE TABLE conversations (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    agent_id INT NOT NULL FOREIGN KEY REFERENCES agents(id),
+    user_id INT NOT NULL FOREIGN KEY REFERENCES users(id),
+    summary NVARCHAR(MAX), -- Compacted summary of the turns marked as summarized
+    summary_tokens INT DEFAULT 0,
+    created_at DATETIME2 DEFAULT GETUTCDATE(),
+    updated_at DATETIME2 DEFAULT GETUTCDATE()
+);
+GO
+
 -- Executions table
 CREATE TABLE executions (
     id INT IDENTITY(1,1) PRIMARY KEY,
     agent_id INT FOREIGN KEY REFERENCES agents(id),
     user_id INT FOREIGN KEY REFERENCES users(id),
+    conversation_id INT FOREIGN KEY REFERENCES conversations(id),
     input_data NVARCHAR(MAX),
     output_data NVARCHAR(MAX),
+    model_name NVARCHAR(50), -- Model that actually served the request
     status NVARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
     execution_time_ms INT,
     tokens_used INT,
@@ -169,11 +214,25 @@ CREATE TABLE costs (
     currency NVARCHAR(3) DEFAULT 'USD',
     tokens_input INT DEFAULT 0,
     tokens_output INT DEFAULT 0,
+    tokens_cached INT DEFAULT 0, -- Input tokens served from the provider's prompt cache
     description NVARCHAR(500),
     created_at DATETIME2 DEFAULT GETUTCDATE()
 );
 GO
 
+-- Conversation messages table
+CREATE TABLE conversation_messages (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    conversation_id INT NOT NULL FOREIGN KEY REFERENCES conversations(id) ON DELETE CASCADE,
+    execution_id INT FOREIGN KEY REFERENCES executions(id),
+    role NVARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant')),
+    content NVARCHAR(MAX) NOT NULL,
+    token_count INT DEFAULT 0,
+    is_summarized BIT DEFAULT 0, -- Folded into conversations.summary
+    created_at DATETIME2 DEFAULT GETUTCDATE()
+);
+GO
+
 -- Create indexes for performance
 CREATE INDEX IX_api_keys_user_id ON api_keys(user_id);
 CREATE INDEX IX_api_keys_api_key ON api_keys(api_key);
@@ -184,6 +243,9 @@ CREATE INDEX IX_executions_user_id ON executions(user_id);
 CREATE INDEX IX_executions_created_at ON executions(started_at);
 CREATE INDEX IX_costs_user_id ON costs(user_id);
 CREATE INDEX IX_costs_created_at ON costs(created_at);
+CREATE INDEX IX_executions_conversation_id ON executions(conversation_id);
+CREATE INDEX IX_conversation_messages_conversation_id ON conversation_messages(conversation_id, is_summarized);
+CREATE INDEX IX_system_config_updated_at ON system_config(updated_at);
 GO
 
 -- Insert default system configuration
@@ -194,6 +256,12 @@ INSERT INTO system_config (config_key, config_value, description) VALUES
 ('hot_reload_enabled', 'true', 'Enable hot reload of configuration changes');
 GO
 
+INSERT INTO system_config_version (id, version) VALUES (1, 0);
+GO
+
+INSERT INTO replica_heartbeat (id) VALUES (1);
+GO
+
 -- Insert default admin user (password: admin123)
 INSERT INTO users (username, email, hashed_password, full_name, role) VALUES
 ('admin', 'admin@example.com', '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewMwIrm4DpGX.Nue', 'System Administrator', 'Admin');
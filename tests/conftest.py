@@ -0,0 +1,70 @@
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.core.database import get_async_db, get_db, get_session_factory, Base
+
+# Test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # The models' server defaults call SQL Server's GETUTCDATE()
+    dbapi_connection.create_function(
+        "getutcdate", 0, lambda: datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+    )
+
+event.listen(engine, "connect", _register_sqlite_functions)
+event.listen(async_engine.sync_engine, "connect", _register_sqlite_functions)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+@pytest.fixture
+def db():
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def make_user(client):
+    """Register and log in a user; returns its id and auth headers"""
+    def make(username):
+        user = client.post(
+            "/api/v1/auth/register",
+            json={"username": username, "email": f"{username}@example.com", "password": "testpassword123"}
+        ).json()
+        token = client.post(
+            "/api/v1/auth/login-json",
+            json={"username": username, "password": "testpassword123"}
+        ).json()["access_token"]
+        return user["id"], {"Authorization": f"Bearer {token}"}
+
+    return make
@@ -0,0 +1,41 @@
+from app.api import agents
+from app.models.execution import Execution
+from app.utils.persistence import save
+from tests.conftest import engine
+
+class RecordingAgentService:
+    """Stands in for the LLM call and records the sessions it was given"""
+    sessions = []
+
+    def __init__(self, db):
+        self.db = db
+        self.sessions.append(db)
+
+    def execute_agent(self, agent_id, user, input_message, context=None, conversation_id=None):
+        execution = Execution(
+            agent_id=agent_id,
+            user_id=user.id,
+            conversation_id=conversation_id,
+            input_data=input_message,
+            output_data="done",
+            status="completed"
+        )
+        save(self.db, execution)
+        return execution
+
+def test_execution_uses_the_overridden_session_factory(client, db, monkeypatch, make_user):
+    monkeypatch.setattr(agents, "AgentService", RecordingAgentService)
+    RecordingAgentService.sessions.clear()
+    _, headers = make_user("executor")
+    agent = client.post("/api/v1/agents/", json={"name": "runner"}, headers=headers).json()
+
+    response = client.post(
+        f"/api/v1/agents/{agent['id']}/execute",
+        json={"input_message": "hello"},
+        headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["output_data"] == "done"
+    assert [session.get_bind() for session in RecordingAgentService.sessions] == [engine]
+    assert db.get(Execution, response.json()["id"]).input_data == "hello"
@@ -1,29 +1,21 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.main import app
-from app.core.database import get_db, Base
+from sqlalchemy import event
 
-# Test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from tests.conftest import async_engine
 
-Base.metadata.create_all(bind=engine)
+@pytest.fixture
+def async_statements():
+    """SQL sent through the aiosqlite engine that overrides get_async_db"""
+    statements = []
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
 
-app.dependency_overrides[get_db] = override_get_db
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
 
-client = TestClient(app)
-
-def test_register_user():
+def test_register_user(client):
     response = client.post(
         "/api/v1/auth/register",
         json={
@@ -39,7 +31,7 @@ def test_register_user():
     assert data["email"] == "test@example.com"
     assert "id" in data
 
-def test_login_user():
+def test_login_user(client):
     # First register a user
     client.post(
         "/api/v1/auth/register",
@@ -64,7 +56,7 @@ def test_login_user():
     assert "access_token" in data
     assert data["token_type"] == "bearer"
 
-def test_get_current_user():
+def test_get_current_user(client):
     # Register and login
     client.post(
         "/api/v1/auth/register",
@@ -91,4 +83,35 @@ def test_get_current_user():
     )
     assert response.status_code == 200
     data = response.json()
-    assert data["username"] == "currentuser"
\ No newline at end of file
+    assert data["username"] == "currentuser"
+
+def test_register_and_login_use_the_async_session(client, async_statements):
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "asyncuser",
+            "email": "async@example.com",
+            "password": "testpassword123"
+        }
+    )
+    assert response.status_code == 200
+    assert any(statement.startswith("INSERT INTO users") for statement in async_statements)
+    
+    async_statements.clear()
+    response = client.post(
+        "/api/v1/auth/login-json",
+        json={"username": "asyncuser", "password": "testpassword123"}
+    )
+    assert response.status_code == 200
+    assert any(statement.startswith("SELECT") and "FROM users" in statement for statement in async_statements)
+
+def test_duplicate_register_and_bad_login_are_rejected(client):
+    user = {"username": "dupuser", "email": "dup@example.com", "password": "testpassword123"}
+    assert client.post("/api/v1/auth/register", json=user).status_code == 200
+    assert client.post("/api/v1/auth/register", json=user).status_code == 400
+    
+    response = client.post(
+        "/api/v1/auth/login-json",
+        json={"username": "dupuser", "password": "wrongpassword"}
+    )
+    assert response.status_code == 401
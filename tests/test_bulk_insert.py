@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, create_engine, event, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.utils.bulk_insert import bulk_insert
+
+Base = declarative_base()
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    return sessionmaker(bind=engine)(), statements
+
+def names_by_id(db):
+    return dict(db.execute(select(Item.id, Item.name)).all())
+
+def test_ids_come_back_in_row_order():
+    db, _ = make_session()
+    db.add(Item(id=5, name="existing"))
+    db.flush()
+
+    rows = [{"name": f"item-{i}"} for i in range(50)]
+    ids = bulk_insert(db, Item, rows)
+
+    assert len(ids) == 50
+    by_id = names_by_id(db)
+    assert [by_id[item_id] for item_id in ids] == [row["name"] for row in rows]
+
+def test_without_return_ids():
+    db, statements = make_session()
+    assert bulk_insert(db, Item, [{"name": "a"}, {"name": "b"}], return_ids=False) == []
+    assert sorted(names_by_id(db).values()) == ["a", "b"]
+    assert not any("RETURNING" in sql for sql in statements)
+
+def test_no_rows_runs_no_statement():
+    db, statements = make_session()
+    assert bulk_insert(db, Item, []) == []
+    assert bulk_insert(db, Item, [], return_ids=False) == []
+    assert statements == []
+    assert not db.in_transaction()
@@ -0,0 +1,37 @@
+import pytest
+
+from app.services.config_registry import ConfigRegistry
+
+def _registry():
+    registry = ConfigRegistry()
+    registry.register("enabled", bool, True)
+    registry.register("limit", int, 10, validator=lambda value: value >= 0)
+    return registry
+
+def test_values_are_converted_once():
+    registry = _registry()
+    typed, errors = registry.convert({"enabled": "false", "limit": "25"}, registry.defaults())
+    assert errors == {}
+    assert typed.enabled is False
+    assert typed.limit == 25
+
+def test_bad_values_keep_previous_value():
+    registry = _registry()
+    previous, _ = registry.convert({"limit": 5}, registry.defaults())
+    typed, errors = registry.convert({"limit": -1, "enabled": "maybe"}, previous)
+    assert set(errors) == {"limit", "enabled"}
+    assert typed.limit == 5
+    assert typed.enabled is True
+
+def test_missing_keys_fall_back_to_default():
+    registry = _registry()
+    previous, _ = registry.convert({"limit": 5}, registry.defaults())
+    typed, _ = registry.convert({}, previous, candidates=["limit"])
+    assert typed.limit == 10
+
+def test_typed_config_is_read_only():
+    typed = _registry().defaults()
+    with pytest.raises(AttributeError):
+        typed.limit = 3
+    with pytest.raises(AttributeError):
+        typed.unknown
@@ -0,0 +1,88 @@
+import pytest
+
+from app.utils import tokens
+from app.utils.context_budget import ContextBudgetExceeded, context_tokens, fit_context_budget, message_tokens
+from app.utils.tokens import truncate_to_tokens
+
+@pytest.fixture(autouse=True)
+def word_estimator(monkeypatch):
+    """Pin the word-based estimator whether or not tiktoken is installed"""
+    monkeypatch.setattr(tokens, "tiktoken", None)
+    tokens._get_encoding.cache_clear()
+    yield
+    tokens._get_encoding.cache_clear()
+
+def test_fitting_request_is_untouched():
+    result = fit_context_budget("hello there", {"a": 1}, 1000)
+    assert result.input_message == "hello there"
+    assert result.context == {"a": 1}
+    assert result.dropped_context_keys == []
+    assert not result.input_truncated
+
+def test_context_keys_dropped_by_priority():
+    context = {"important": "x " * 50, "minor": "y " * 50, "unlisted": "z " * 50}
+    available = message_tokens("question") + context_tokens({"important": "x " * 50})
+    result = fit_context_budget("question", context, available, key_priority=["important", "minor"])
+    assert result.dropped_context_keys == ["unlisted", "minor"]
+    assert list(result.context) == ["important"]
+    assert result.prompt_tokens <= available
+
+def test_input_truncation_strategies():
+    text = " ".join(f"w{i}" for i in range(200))
+    head = fit_context_budget(text, {}, 60, strategy="head")
+    tail = fit_context_budget(text, {}, 60, strategy="tail")
+    assert head.input_truncated and head.input_message.startswith("w0 ")
+    assert tail.input_truncated and tail.input_message.endswith("w199")
+    
+    middle = fit_context_budget(text, {}, 60, strategy="middle")
+    assert middle.input_truncated and middle.prompt_tokens <= 60
+    assert middle.input_message.startswith("w0 ") and middle.input_message.endswith("w199")
+    assert "\n...\n" in middle.input_message
+
+def test_middle_truncation_counts_the_marker():
+    text = " ".join(f"w{i}" for i in range(200))
+    for max_tokens in range(1, 80):
+        truncated = truncate_to_tokens(text, max_tokens, "middle")
+        assert tokens.count_tokens(truncated) <= max_tokens
+    assert "\n...\n" in truncate_to_tokens(text, 10, "middle")
+    assert truncate_to_tokens(text, 1, "middle").strip() == "w0"
+
+def test_middle_truncation_with_tokenizer(monkeypatch):
+    class CharEncoding:
+        """One token per character"""
+        def encode(self, text, disallowed_special=()):
+            return list(text)
+
+        def decode(self, tokens):
+            return "".join(tokens)
+
+    class FakeTiktoken:
+        @staticmethod
+        def encoding_for_model(model_name):
+            return CharEncoding()
+
+    monkeypatch.setattr(tokens, "tiktoken", FakeTiktoken)
+    text = "a" * 50 + "b" * 50
+    assert truncate_to_tokens(text, 25, "middle") == "a" * 10 + "\n...\n" + "b" * 10
+    assert truncate_to_tokens(text, 4, "middle") == "aaaa"
+    result = fit_context_budget(text, {}, 30, strategy="middle")
+    assert result.prompt_tokens <= 30
+    assert result.input_message == "a" * 11 + "\n...\n" + "b" * 10
+
+def test_reject_strategy_raises():
+    with pytest.raises(ContextBudgetExceeded):
+        fit_context_budget("word " * 500, {}, 50, strategy="reject")
+
+def test_encoding_load_failure_falls_back_to_estimator(monkeypatch):
+    attempts = []
+
+    class OfflineTiktoken:
+        @staticmethod
+        def encoding_for_model(model_name):
+            attempts.append(model_name)
+            raise OSError("no network")
+
+    monkeypatch.setattr(tokens, "tiktoken", OfflineTiktoken)
+    assert tokens.count_tokens("one two three", "gpt-4") == tokens.estimate_tokens("one two three")
+    assert tokens.count_tokens("one two three", "gpt-4") == tokens.estimate_tokens("one two three")
+    assert attempts == ["gpt-4"]
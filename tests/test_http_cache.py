@@ -0,0 +1,80 @@
+import time
+
+import httpx
+import pytest
+
+from app.models.tool import Tool
+from app.services.tool_service import ToolResponse, ToolService
+from app.utils.http_cache import CachedResponse, ResponseCache, parse_cache_control
+
+def entry(tool_id, size, ttl=60):
+    return CachedResponse(tool_id=tool_id, status_code=200, data="x" * size, size=size, expires_at=time.time() + ttl)
+
+def test_global_cap_evicts_least_recently_used():
+    cache = ResponseCache(max_bytes=100)
+    assert cache.put("a", entry(1, 40), tool_max_bytes=100)
+    assert cache.put("b", entry(2, 40), tool_max_bytes=100)
+    cache.get("a")  # b is now the least recently used
+    assert cache.put("c", entry(3, 40), tool_max_bytes=100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["total_bytes"] == 80
+
+def test_tool_cap_evicts_only_that_tools_entries():
+    cache = ResponseCache(max_bytes=1000)
+    cache.put("a1", entry(1, 30), tool_max_bytes=50)
+    cache.put("b1", entry(2, 30), tool_max_bytes=50)
+    cache.put("a2", entry(1, 30), tool_max_bytes=50)
+
+    assert cache.get("a1") is None
+    assert cache.get("a2") is not None
+    assert cache.get("b1") is not None
+    assert cache.stats()["total_bytes"] == 60
+
+def test_entries_over_a_cap_are_not_stored():
+    cache = ResponseCache(max_bytes=100)
+    assert not cache.put("a", entry(1, 60), tool_max_bytes=50)
+    assert not cache.put("b", entry(1, 150), tool_max_bytes=200)
+    assert cache.stats()["entries"] == 0
+
+def test_replacing_a_key_releases_its_bytes():
+    cache = ResponseCache(max_bytes=100)
+    cache.put("a", entry(1, 60), tool_max_bytes=100)
+    cache.put("a", entry(1, 70), tool_max_bytes=100)
+    assert cache.stats() == {"entries": 1, "total_bytes": 70, "max_bytes": 100}
+
+def test_invalidate_tool():
+    cache = ResponseCache(max_bytes=100)
+    cache.put("a", entry(1, 10), tool_max_bytes=100)
+    cache.put("b", entry(2, 10), tool_max_bytes=100)
+    cache.invalidate_tool(1)
+    assert cache.get("a") is None
+    assert cache.stats()["total_bytes"] == 10
+
+@pytest.mark.parametrize("header, expected", [
+    (None, {}),
+    ("no-store", {"no-store": None}),
+    ("max-age=60", {"max-age": "60"}),
+    ('Private, Max-Age="30"', {"private": None, "max-age": "30"}),
+    ("private, no-cache, ,max-age=0", {"private": None, "no-cache": None, "max-age": "0"}),
+])
+def test_parse_cache_control(header, expected):
+    assert parse_cache_control(header) == expected
+
+@pytest.mark.parametrize("headers, expected", [
+    ({}, 300),
+    ({"Cache-Control": "max-age=60"}, 60),
+    ({"Cache-Control": "max-age=900"}, 300),
+    ({"Cache-Control": "max-age=-5"}, None),
+    ({"Cache-Control": "max-age=soon"}, 300),
+    ({"Cache-Control": "private, max-age=30"}, 30),
+    ({"Cache-Control": "no-store, max-age=60"}, None),
+    ({"Cache-Control": "no-cache"}, None),
+    ({"Cache-Control": "no-cache", "ETag": '"v1"'}, 0),
+])
+def test_cache_ttl(headers, expected):
+    tool = Tool(cache_ttl_seconds=300)
+    response = ToolResponse(status_code=200, headers=httpx.Headers(headers), data={}, size=2)
+    assert ToolService(db=None)._cache_ttl(tool, response) == expected
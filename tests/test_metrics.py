@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+from app.services.cost_service import CostService
+
+def test_costs_summary(client, db, make_user):
+    user_id, headers = make_user("costuser")
+    other_id, _ = make_user("othercostuser")
+    service = CostService(db)
+    service.record_costs([
+        service.cost_row(user_id=user_id, cost_type="llm_call", amount=Decimal("0.25"), tokens_input=100, tokens_output=20, tokens_cached=40),
+        service.cost_row(user_id=user_id, cost_type="tool_call", amount=Decimal("0.01")),
+        service.cost_row(user_id=user_id, cost_type="tool_call", amount=Decimal("0")),
+        service.cost_row(user_id=other_id, cost_type="tool_call", amount=Decimal("5"))
+    ])
+
+    response = client.get("/api/v1/metrics/costs", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_amount"] == 0.26
+    assert data["total_entries"] == 3
+    assert data["total_tokens_input"] == 100
+    assert data["total_tokens_cached"] == 40
+    assert data["by_type"]["tool_call"]["count"] == 2
+
+    response = client.get("/api/v1/metrics/costs", params={"cost_type": "tool_call"}, headers=headers)
+    assert response.json()["total_entries"] == 2
+
+def test_costs_require_authentication(client):
+    assert client.get("/api/v1/metrics/costs").status_code in (401, 403)
@@ -0,0 +1,68 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, create_engine, event, func
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+
+from app.utils.persistence import save
+
+Base = declarative_base()
+
+class Parent(Base):
+    __tablename__ = "parents"
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+    children = relationship("Child")
+
+class Child(Base):
+    __tablename__ = "children"
+
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, ForeignKey("parents.id"))
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    return sessionmaker(bind=engine)(), statements
+
+def test_saved_instance_is_readable_without_select():
+    db, statements = make_session()
+    parent = Parent(name="a")
+    save(db, parent)
+
+    statements.clear()
+    assert parent.id is not None
+    assert parent.created_at is not None
+    assert parent.name == "a"
+    assert statements == []
+
+def test_unset_columns_are_readable_after_close():
+    db, _ = make_session()
+    parent = Parent()
+    save(db, parent)
+    parent.name = "b"
+    save(db, parent)
+    db.close()
+
+    assert parent.name == "b"
+    assert parent.created_at is not None
+
+    child = Child()
+    save(db, child)
+    db.close()
+    assert child.parent_id is None
+
+def test_other_state_still_expires_on_commit():
+    db, statements = make_session()
+    parent = Parent(name="a", children=[Child(), Child()])
+    save(db, parent)
+
+    db.query(Child).filter(Child.parent_id == parent.id).delete()
+    parent.name = "b"
+    save(db, parent)
+
+    assert parent.updated_at is not None
+    assert parent.children == []
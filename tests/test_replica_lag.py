@@ -0,0 +1,21 @@
+from app.utils.replica_lag import ReplicaLag
+
+def test_unmeasured_replica_is_not_fresh():
+    lag = ReplicaLag(max_lag_seconds=5)
+    assert lag.staleness() is None
+    assert not lag.is_fresh()
+
+def test_staleness_grows_with_age_of_measurement():
+    lag = ReplicaLag(max_lag_seconds=5)
+    lag.record(2.0, now=100.0)
+    assert lag.staleness(now=100.0) == 2.0
+    assert lag.is_fresh(now=102.0)
+    assert lag.staleness(now=104.0) == 6.0
+    assert not lag.is_fresh(now=104.0)
+
+def test_failed_check_stops_replica_reads():
+    lag = ReplicaLag(max_lag_seconds=5)
+    lag.record(0.5, now=100.0)
+    lag.record_failure("connection refused")
+    assert not lag.is_fresh(now=100.0)
+    assert lag.snapshot()["error"] == "connection refused"
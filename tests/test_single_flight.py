@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+def test_followers_share_the_leader_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "body"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert calls == [1]
+    assert results == [("body", False), ("body", True), ("body", True)]
+    assert flight.in_flight() == 0
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "body"
+
+    async def main():
+        leader = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == ("body", True)
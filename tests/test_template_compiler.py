@@ -0,0 +1,66 @@
+from app.utils.template_compiler import (
+    analyze_template,
+    compile_template,
+    CachedTemplate,
+    PromptTemplateCache
+)
+
+def test_render_substitutes_variables():
+    compiled = compile_template("Hello {name}, welcome to {place}!")
+    assert compiled.variables == ["name", "place"]
+    assert compiled.render({"name": "Ana", "place": "Lima"}) == "Hello Ana, welcome to Lima!"
+
+def test_render_does_not_resubstitute_values():
+    compiled = compile_template("{a} and {b}")
+    assert compiled.render({"a": "{b}", "b": "x"}) == "{b} and x"
+
+def test_render_keeps_unknown_placeholders():
+    compiled = compile_template("{known} {unknown}")
+    assert compiled.render({"known": 1}) == "1 {unknown}"
+
+def test_escaped_braces_render_literally():
+    analysis = analyze_template("{{name}} is {name}")
+    assert analysis.variables == ["name"]
+    assert analysis.escape_count == 2
+    assert analysis.issues == []
+    assert compile_template("{{name}} is {name}").render({"name": "Ana"}) == "{name} is Ana"
+
+def test_issues_report_offsets():
+    analysis = analyze_template("a {} b { c } d }")
+    assert [(issue.message, issue.offset) for issue in analysis.issues] == [
+        ("Empty variable declaration", 2),
+        ("Unmatched '}'", 15)
+    ]
+    assert analysis.variables == [" c "]
+    
+    analysis = analyze_template("open {name")
+    assert [(issue.message, issue.offset) for issue in analysis.issues] == [("Unclosed '{'", 5)]
+
+def _cached(template_id, name, version):
+    return CachedTemplate(
+        id=template_id,
+        name=name,
+        version=version,
+        is_active=True,
+        created_by=1,
+        required_variables=("name",),
+        compiled=compile_template("Hi {name}")
+    )
+
+def test_cache_tracks_latest_version_by_name():
+    cache = PromptTemplateCache(ttl_seconds=60)
+    cache.put(_cached(1, "greeting", 1), latest=True)
+    assert cache.get_latest("greeting").version == 1
+    
+    cache.invalidate_name("greeting")
+    assert cache.get_latest("greeting") is None
+    assert cache.get(1).version == 1
+    
+    cache.put(_cached(2, "greeting", 2), latest=True)
+    cache.invalidate(2)
+    assert cache.get_latest("greeting") is None
+
+def test_cache_entries_expire():
+    cache = PromptTemplateCache(ttl_seconds=-1)
+    cache.put(_cached(1, "greeting", 1))
+    assert cache.get(1) is None
@@ -0,0 +1,215 @@
+import asyncio
+from decimal import Decimal
+from itertools import count
+
+import httpx
+import pytest
+
+from app.models.cost import Cost
+from app.models.tool import Tool
+from app.services import tool_service
+from app.services.tool_service import ToolService
+from app.utils.circuit_breaker import tool_circuit_breakers
+from app.utils.http_cache import tool_response_cache
+
+_names = count()
+
+@pytest.fixture
+def make_tool(db):
+    tools = []
+
+    def make(**overrides):
+        values = {
+            "name": f"tool-{next(_names)}",
+            "endpoint_template": "https://api.example.com/items",
+            "cost_per_request": Decimal("0.01")
+        }
+        values.update(overrides)
+        tool = Tool(**values)
+        db.add(tool)
+        db.commit()
+        tools.append(tool)
+        return tool
+
+    yield make
+    for tool in tools:
+        tool_response_cache.invalidate_tool(tool.id)
+
+def tool_costs(db, tool):
+    db.expire_all()
+    return db.query(Cost).filter(Cost.tool_id == tool.id).order_by(Cost.id).all()
+
+def test_paid_and_cached_calls_write_cost_rows(db, make_tool):
+    tool = make_tool(cache_enabled=True)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"items": [1, 2]}, headers={"Cache-Control": "max-age=60"})
+
+    service = ToolService(db, transport=httpx.MockTransport(handler))
+    paid = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    cached = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+
+    assert len(calls) == 1
+    assert paid["cache_status"] == "miss"
+    assert cached["cache_status"] == "hit"
+    assert cached["data"] == {"items": [1, 2]}
+    costs = tool_costs(db, tool)
+    assert [(c.cost_type, c.user_id, c.amount) for c in costs] == [
+        ("tool_call", 1, Decimal("0.01")),
+        ("tool_call", 1, Decimal("0")),
+    ]
+    assert service.pending_costs == []
+
+def test_deferred_costs_are_written_by_flush(db, make_tool):
+    tool = make_tool()
+    service = ToolService(db, transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+
+    asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template, record_costs=False))
+    asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template, record_costs=False))
+    assert tool_costs(db, tool) == []
+
+    assert len(service.flush_costs(commit=True)) == 2
+    assert [c.amount for c in tool_costs(db, tool)] == [Decimal("0.01"), Decimal("0.01")]
+
+def test_revalidated_cache_hit_costs_nothing(db, make_tool):
+    tool = make_tool(cache_enabled=True)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, json={"v": 1}, headers={"Cache-Control": "no-cache", "ETag": '"v1"'})
+
+    service = ToolService(db, transport=httpx.MockTransport(handler))
+    asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    result = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+
+    assert len(requests) == 2
+    assert result["cache_status"] == "revalidated"
+    assert result["data"] == {"v": 1}
+    assert [c.amount for c in tool_costs(db, tool)] == [Decimal("0.01"), Decimal("0")]
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def record_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(tool_service.asyncio, "sleep", record_sleep)
+    return delays
+
+@pytest.mark.parametrize("method, idempotent_writes, expected_attempts", [
+    ("GET", False, 3),
+    ("POST", False, 1),
+    ("POST", True, 1),
+    ("PUT", False, 1),
+    ("PUT", True, 3),
+    ("DELETE", False, 1),
+    ("DELETE", True, 3),
+])
+def test_retry_policy_by_method(db, make_tool, sleeps, method, idempotent_writes, expected_attempts):
+    tool = make_tool(retry_max_attempts=2, retry_backoff_ms=100, idempotent_writes=idempotent_writes)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    service = ToolService(db, transport=httpx.MockTransport(handler))
+    result = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template, method=method))
+
+    assert result["status_code"] == 503
+    assert len(requests) == expected_attempts
+    assert len(sleeps) == expected_attempts - 1
+    assert result.get("attempts", 1) == expected_attempts
+
+def test_retry_stops_at_first_success(db, make_tool, sleeps):
+    tool = make_tool(retry_max_attempts=5)
+    statuses = iter([502, 200])
+    service = ToolService(db, transport=httpx.MockTransport(lambda request: httpx.Response(next(statuses), json={})))
+
+    result = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    assert result["status_code"] == 200
+    assert result["attempts"] == 2
+    assert result["cost"] == pytest.approx(0.02)
+
+def test_retry_after_is_honored_up_to_the_cap(db, make_tool, sleeps, monkeypatch):
+    monkeypatch.setattr(tool_service.settings, "tool_retry_max_backoff_ms", 5000)
+    tool = make_tool(retry_max_attempts=2)
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(429, headers={"Retry-After": "60"}),
+        httpx.Response(200, json={})
+    ])
+    service = ToolService(db, transport=httpx.MockTransport(lambda request: next(responses)))
+
+    result = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    assert result["status_code"] == 200
+    assert sleeps == [2.0, 5.0]
+
+def test_backoff_is_capped(db, make_tool, sleeps, monkeypatch):
+    monkeypatch.setattr(tool_service.settings, "tool_retry_max_backoff_ms", 1000)
+    monkeypatch.setattr(tool_service.random, "uniform", lambda low, high: high)
+    tool = make_tool(retry_max_attempts=4, retry_backoff_ms=300)
+    service = ToolService(db, transport=httpx.MockTransport(lambda request: httpx.Response(504)))
+
+    asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    assert sleeps == pytest.approx([0.3, 0.6, 1.0, 1.0])
+
+def test_open_circuit_fails_fast(db, make_tool):
+    tool = make_tool(circuit_error_threshold=Decimal("0.5"), circuit_min_requests=2, circuit_open_seconds=30)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(500)
+
+    service = ToolService(db, transport=httpx.MockTransport(handler))
+    try:
+        for _ in range(2):
+            asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+        result = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    finally:
+        tool_circuit_breakers.reset(tool.id)
+
+    assert len(requests) == 2
+    assert result["status_code"] == 503
+    assert result["circuit_open"]
+    assert len(tool_costs(db, tool)) == 2
+
+def test_oversized_body_is_truncated_and_not_cached(db, make_tool):
+    tool = make_tool(max_response_bytes=16, cache_enabled=True)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=b'{"items": "' + b"x" * 100 + b'"}', headers={"Content-Type": "application/json"})
+
+    service = ToolService(db, transport=httpx.MockTransport(handler))
+    first = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    second = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+
+    assert first["truncated"]
+    assert first["data"] == '{"items": "xxxxx'
+    assert second["cache_status"] == "miss"
+    assert len(requests) == 2
+
+def test_response_hooks_run_on_the_parsed_payload(db, make_tool, monkeypatch):
+    monkeypatch.setattr(tool_service, "_response_hooks", [])
+    seen = []
+
+    def keep_first_item(tool, response):
+        seen.append((tool.name, response.status_code, response.data))
+        return {"items": response.data["items"][:1]}
+
+    tool_service.register_response_hook(keep_first_item)
+    tool = make_tool()
+    service = ToolService(db, transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"items": [1, 2, 3]})))
+
+    result = asyncio.run(service.execute_tool(tool.id, 1, tool.endpoint_template))
+    assert seen == [(tool.name, 200, {"items": [1, 2, 3]})]
+    assert result["data"] == {"items": [1]}